@@ -0,0 +1,168 @@
+"""
+Helpers shared by the standalone benchmarks in this directory. Every script
+runs from backend/ (`python benchmarks/<name>.py --help`) and works in a
+scratch directory, so it never touches ./lexguard.db, ./chroma_db or the
+caches of a real install.
+"""
+import contextlib
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+CONTRACT_TERMS = [
+    "termination", "notice", "indemnity", "liability", "payment", "invoice",
+    "confidentiality", "arbitration", "jurisdiction", "governing", "law",
+    "breach", "remedy", "warranty", "assignment", "force", "majeure",
+    "renewal", "penalty", "interest", "lessor", "lessee", "licensor",
+    "licensee", "supplier", "purchaser", "deliverables", "milestone",
+    "intellectual", "property", "non-compete", "non-solicitation", "stamp",
+    "duty", "GST", "TDS", "Mumbai", "Delhi", "Bengaluru", "Section",
+    "Clause", "Schedule", "Annexure", "days", "months", "INR", "lakh", "crore",
+]
+
+def use_scratch_dir(prefix: str = "lexguard-bench-") -> str:
+    """
+    Moves into a fresh temp directory; call before importing anything from
+    core/ or services/ so their relative paths land there.
+    """
+    directory = tempfile.mkdtemp(prefix=prefix)
+    os.chdir(directory)
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(directory, 'bench.db')}")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    return directory
+
+def use_fake_embeddings(size: int = 384):
+    """
+    Replaces MiniLM with a deterministic hash embedding of the same size, for
+    machines that can't download the model. Numbers then measure the
+    plumbing around the model, not the model itself.
+    """
+    import langchain_community.embeddings as embeddings
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    class FakeHuggingFaceEmbeddings(DeterministicFakeEmbedding):
+        def __init__(self, model_name=None, **kwargs):
+            super().__init__(size=size)
+
+    embeddings.HuggingFaceEmbeddings = FakeHuggingFaceEmbeddings
+
+SERVER = """
+import sys
+sys.path.insert(0, {bench_dir!r})
+import _common
+if {fake}:
+    _common.use_fake_embeddings()
+import uvicorn
+uvicorn.run("main:app", host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def spawn_server(workdir: str, fake_embeddings: bool = False, env: dict = None):
+    """
+    Starts the API in a uvicorn subprocess running in `workdir`. Returns the
+    process and its base URL; the caller terminates it.
+    """
+    port = free_port()
+    code = SERVER.format(bench_dir=BENCH_DIR, fake=fake_embeddings, port=port)
+    server_env = dict(os.environ, PYTHONPATH=BACKEND_DIR, **(env or {}))
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=workdir, env=server_env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process, f"http://127.0.0.1:{port}"
+
+def http_status(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+def wait_for(url: str, accept, started: float, timeout: float) -> float:
+    """
+    Polls `url` until accept(status code) holds; returns seconds since `started`.
+    """
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        if accept(http_status(url)):
+            return time.perf_counter() - started
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} not served within {timeout:g}s")
+
+@contextlib.contextmanager
+def running_server(workdir: str, fake_embeddings: bool = False, env: dict = None,
+                   ready_path: str = "/ready", timeout: float = 300):
+    """
+    spawn_server, waiting until `ready_path` answers 200 so the first timed
+    request doesn't pay for the warm-up. Benchmarks that never touch the
+    vector path can pass "/".
+    """
+    process, base_url = spawn_server(workdir, fake_embeddings, env)
+    try:
+        wait_for(base_url + ready_path, lambda code: code == 200, time.perf_counter(), timeout)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(30)
+
+@contextlib.contextmanager
+def quiet():
+    """
+    Silences the services' per-call progress prints while timing.
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def synthetic_clause(rng: random.Random, words: int = 120) -> str:
+    return " ".join(rng.choice(CONTRACT_TERMS) for _ in range(words)) + "."
+
+def synthetic_query(rng: random.Random, words: int = 8) -> str:
+    return "What does the contract say about " + " ".join(rng.choice(CONTRACT_TERMS) for _ in range(words)) + "?"
+
+def percentile(samples, p: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+def latency_line(samples) -> str:
+    """
+    "p50 … ms  p99 … ms  max … ms  (n=…)" for a list of durations in seconds.
+    """
+    return (
+        f"p50 {percentile(samples, 50) * 1000:8.2f} ms  "
+        f"p99 {percentile(samples, 99) * 1000:8.2f} ms  "
+        f"max {max(samples, default=0) * 1000:8.2f} ms  (n={len(samples)})"
+    )
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except OSError:
+        return peak_rss_mb()
+
+def peak_rss_mb(children: bool = False) -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # Linux reports KiB, macOS bytes
+    divisor = 1024 ** 2 if sys.platform == "darwin" else 1024
+    return usage.ru_maxrss / divisor
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Cold-start time of the API: from spawning a fresh uvicorn process to the
+first served GET /, and to GET /ready turning 200 (embedding model and
+vector store warm).
+
+Before the lazy warm-up, the model loaded at import, so the first request
+could not be served before what is now the "ready" time.
+
+    python benchmarks/cold_start.py --runs 5
+    python benchmarks/cold_start.py --fake-embeddings --path /api/auth/me
+"""
+import argparse
+import time
+from _common import use_scratch_dir, spawn_server, wait_for, percentile
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--path", default="/", help="route used as the first request")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--fake-embeddings", action="store_true", help="hash embeddings instead of MiniLM")
+    return parser.parse_args()
+
+def one_run(args, workdir: str):
+    started = time.perf_counter()
+    server, base_url = spawn_server(workdir, args.fake_embeddings)
+    try:
+        # Any HTTP answer counts: an auth route answering 401 was still served
+        first = wait_for(base_url + args.path, lambda code: code is not None, started, args.timeout)
+        ready = wait_for(base_url + "/ready", lambda code: code == 200, started, args.timeout)
+        return first, ready
+    finally:
+        server.terminate()
+        server.wait(30)
+
+def main():
+    args = parse_args()
+    workdir = use_scratch_dir()
+    firsts, readies = [], []
+    for run in range(args.runs):
+        first, ready = one_run(args, workdir)
+        firsts.append(first)
+        readies.append(ready)
+        print(f"  run {run + 1}: first {args.path} {first:6.2f}s, /ready {ready:6.2f}s")
+
+    print(f"\n⏱️ Cold start over {args.runs} runs (median / worst)")
+    for label, samples in ((f"first request {args.path}", firsts), ("vector path ready", readies)):
+        print(f"  {label:<28} {percentile(samples, 50):6.2f}s / {max(samples):6.2f}s")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Chat throughput against the number of concurrent clients, on a real
+uvicorn worker.
+
+The LLM is the local fake with a fixed --llm-delay per answer standing in
+for GPT-4o's network time, and the query cache is off, so every message
+goes through the DB, retrieval and the LLM. On a non-blocking request path
+throughput grows with clients until the CPU saturates; if anything blocked
+the event loop it would stay flat at about 1 / llm-delay. A probe client
+hits GET /api/auth/me throughout to show what a light route sees.
+
+The fake LLM sleeps on asyncio's default executor, which holds at most
+min(32, CPUs + 4) answers in flight; the printed ceiling accounts for it.
+GPT-4o through the async OpenAI client has no such cap.
+
+    python benchmarks/concurrency.py --clients 1,4,16,64
+    python benchmarks/concurrency.py --llm-delay 0.5 --requests 10
+"""
+import argparse
+import asyncio
+import os
+import time
+import httpx
+from _common import use_scratch_dir, running_server, latency_line
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", default="1,2,4,8,16,32")
+    parser.add_argument("--requests", type=int, default=20, help="chat messages per client")
+    parser.add_argument("--llm-delay", type=float, default=0.25, help="seconds per fake LLM answer")
+    parser.add_argument("--fake-embeddings", action="store_true", help="hash embeddings instead of MiniLM")
+    return parser.parse_args()
+
+async def sign_in(client: httpx.AsyncClient) -> dict:
+    account = {"email": "bench@lexguard.test", "password": "benchmark-password", "name": "Bench"}
+    await client.post("/api/auth/register", json=account)
+    response = await client.post("/api/auth/login", data={"username": account["email"], "password": account["password"]})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def chat_client(client, case_id: str, requests: int, samples: list, errors: list):
+    for i in range(requests):
+        start = time.perf_counter()
+        response = await client.post(f"/api/cases/{case_id}/messages", json={"content": f"What is the notice period? ({i})"})
+        samples.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+async def probe(client, headers: dict, samples: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/auth/me", headers=headers)
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+
+async def run_level(client, headers: dict, clients: int, requests: int):
+    # One case per client, so no client's history grows faster than another's
+    case_ids = []
+    for i in range(clients):
+        response = await client.post("/api/cases/", json={"title": f"Bench case {i}", "category": "Contract"}, headers=headers)
+        case_ids.append(response.json()["id"])
+
+    chat_samples, probe_samples, errors = [], [], []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(client, headers, probe_samples, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(chat_client(client, case_id, requests, chat_samples, errors) for case_id in case_ids))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await prober
+    return elapsed, chat_samples, probe_samples, errors
+
+async def run(args, base_url: str):
+    levels = [int(level) for level in args.clients.split(",")]
+    limits = httpx.Limits(max_connections=max(levels) + 8, max_keepalive_connections=max(levels) + 8)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        headers = await sign_in(client)
+        await run_level(client, headers, 1, 2)
+
+        print(f"⏱️ Chat throughput, {args.requests} messages per client, LLM delay {args.llm_delay:g}s")
+        for clients in levels:
+            elapsed, chat_samples, probe_samples, errors = await run_level(client, headers, clients, args.requests)
+            total = clients * args.requests
+            in_flight = min(clients, 32, (os.cpu_count() or 1) + 4)
+            ideal = in_flight / args.llm_delay if args.llm_delay else float("inf")
+            print(f"\n  {clients:>3} clients: {total / elapsed:7.1f} msg/s (ceiling {ideal:.1f}), {len(errors)} errors")
+            print(f"    chat      {latency_line(chat_samples)}")
+            print(f"    /auth/me  {latency_line(probe_samples)}")
+
+def main():
+    args = parse_args()
+    workdir = use_scratch_dir()
+    env = {
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_TOKEN_DELAY": str(args.llm_delay),
+        "QUERY_CACHE_ENABLED": "false",
+    }
+    with running_server(workdir, args.fake_embeddings, env) as base_url:
+        asyncio.run(run(args, base_url))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
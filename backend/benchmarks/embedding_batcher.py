@@ -0,0 +1,101 @@
+"""
+Embedding throughput and latency through the micro-batcher at different
+batch sizes, against calling the model directly from every thread.
+
+Concurrent clients mimic uploads and chats: each request is either one
+chat query or a document batch of --chunks-per-doc chunks. Throughput is
+texts embedded per second; latency is per request, split by kind.
+
+    python benchmarks/embedding_batcher.py --clients 16 --batch-sizes 1,16,64,128
+    python benchmarks/embedding_batcher.py --workers 2 --max-wait-ms 5
+"""
+import argparse
+import random
+import threading
+import time
+from _common import use_scratch_dir, use_fake_embeddings, synthetic_clause, synthetic_query, latency_line, quiet
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch-sizes", default="1,8,32,64,128")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=40, help="requests per client")
+    parser.add_argument("--doc-share", type=float, default=0.3, help="fraction of requests that are document batches")
+    parser.add_argument("--chunks-per-doc", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="batcher worker threads")
+    parser.add_argument("--fake-embeddings", action="store_true", help="hash embeddings instead of MiniLM")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+def workload(args, rng):
+    # Unique texts per request, so no run benefits from a warm tokenizer cache
+    plans = []
+    for client in range(args.clients):
+        plan = []
+        for i in range(args.requests):
+            if rng.random() < args.doc_share:
+                plan.append(("document", [f"{synthetic_clause(rng)} ({client}/{i}/{j})" for j in range(args.chunks_per_doc)]))
+            else:
+                plan.append(("query", f"{synthetic_query(rng)} ({client}/{i})"))
+        plans.append(plan)
+    return plans
+
+def run(embeddings, plans):
+    latencies = {"query": [], "document": []}
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(plans) + 1)
+
+    def client(plan):
+        barrier.wait()
+        for kind, payload in plan:
+            start = time.perf_counter()
+            if kind == "query":
+                embeddings.embed_query(payload)
+            else:
+                embeddings.embed_documents(payload)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[kind].append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(plan,)) for plan in plans]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+def main():
+    args = parse_args()
+    use_scratch_dir()
+    if args.fake_embeddings:
+        use_fake_embeddings()
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from services.embedding_batcher import BatchedEmbeddings
+    from services.rag_service import EMBEDDING_MODEL
+
+    rng = random.Random(args.seed)
+    with quiet():
+        model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    model.embed_documents([synthetic_clause(rng) for _ in range(8)])
+
+    print(f"⏱️ {args.clients} clients x {args.requests} requests, {args.doc_share:.0%} document batches "
+          f"of {args.chunks_per_doc}, {args.workers} worker(s), max wait {args.max_wait_ms:g} ms")
+    configs = [("unbatched", None)] + [(f"batch {size}", int(size)) for size in args.batch_sizes.split(",")]
+    for label, size in configs:
+        if size is None:
+            embeddings = model
+        else:
+            embeddings = BatchedEmbeddings(model, max_batch_size=size, max_wait_ms=args.max_wait_ms, workers=args.workers)
+        plans = workload(args, rng)
+        texts = sum(1 if kind == "query" else len(payload) for plan in plans for kind, payload in plan)
+        elapsed, latencies = run(embeddings, plans)
+        print(f"\n  {label}: {texts / elapsed:9.1f} texts/s ({texts} texts in {elapsed:.2f}s)")
+        print(f"    query     {latency_line(latencies['query'])}")
+        print(f"    document  {latency_line(latencies['document'])}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Login throughput during a login storm, and what the storm does to the
+latency of other routes on the same uvicorn worker.
+
+For each mode a fresh server is started: "pool" hashes in the dedicated
+process pool (PASSWORD_HASH_WORKERS), "threadpool" hashes in the request
+threadpool (PASSWORD_HASH_WORKERS=0). A probe client times GET /api/cases/
+alone first, then while --clients concurrent clients log in as fast as
+they can. Logins refused with 503 by the admission limit are counted
+separately.
+
+    python benchmarks/login_storm.py --clients 32 --seconds 15
+    BCRYPT_ROUNDS=10 python benchmarks/login_storm.py --modes pool
+"""
+import argparse
+import asyncio
+import os
+import time
+import httpx
+from _common import use_scratch_dir, running_server, latency_line
+
+ACCOUNT = {"email": "storm@lexguard.test", "password": "benchmark-password", "name": "Storm"}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", default="pool,threadpool")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent login clients")
+    parser.add_argument("--seconds", type=float, default=10, help="per phase")
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    return parser.parse_args()
+
+async def probe(client, samples: list, stop: asyncio.Event, interval: float):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/cases/", params={"limit": 20})
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+async def login_client(client, deadline: float, samples: list, outcomes: dict):
+    form = {"username": ACCOUNT["email"], "password": ACCOUNT["password"]}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.post("/api/auth/login", data=form)
+        if response.status_code == 200:
+            samples.append(time.perf_counter() - start)
+        outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+async def run(args, base_url: str):
+    limits = httpx.Limits(max_connections=args.clients + 8, max_keepalive_connections=args.clients + 8)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        await client.post("/api/auth/register", json=ACCOUNT)
+
+        quiet_samples = []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, quiet_samples, stop, args.probe_interval))
+        await asyncio.sleep(args.seconds)
+        stop.set()
+        await prober
+
+        storm_samples, login_samples, outcomes = [], [], {}
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, storm_samples, stop, args.probe_interval))
+        start = time.perf_counter()
+        deadline = start + args.seconds
+        await asyncio.gather(*(login_client(client, deadline, login_samples, outcomes) for _ in range(args.clients)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+        return quiet_samples, storm_samples, login_samples, outcomes, elapsed
+
+def main():
+    args = parse_args()
+    workdir = use_scratch_dir()
+    rounds = os.getenv("BCRYPT_ROUNDS", "12")
+    print(f"⏱️ Login storm: {args.clients} clients for {args.seconds:g}s, bcrypt cost {rounds}")
+    for mode in args.modes.split(","):
+        env = {"PASSWORD_HASH_WORKERS": "0"} if mode == "threadpool" else {}
+        with running_server(workdir, env=env, ready_path="/") as base_url:
+            quiet_samples, storm_samples, login_samples, outcomes, elapsed = asyncio.run(run(args, base_url))
+        refused = outcomes.get(503, 0)
+        failed = sum(count for status, count in outcomes.items() if status not in (200, 503))
+        print(f"\n  {mode}: {len(login_samples) / elapsed:6.1f} logins/s, {refused} refused (503), {failed} failed")
+        print(f"    login              {latency_line(login_samples)}")
+        print(f"    /api/cases/ quiet  {latency_line(quiet_samples)}")
+        print(f"    /api/cases/ storm  {latency_line(storm_samples)}")
+        # Each mode gets a clean database
+        for suffix in ("", "-wal", "-shm"):
+            path = os.path.join(workdir, "bench.db" + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+Pages per second and peak RSS of PDF text extraction on synthetic
+multi-hundred-page contracts.
+
+Each mode runs in its own process so peak RSS isn't shared between them:
+"load" is the old PyPDFLoader(...).load() plus one joined string, "stream"
+is iter_pdf_pages() in the calling process and "parallel" fans page ranges
+out to the extraction pool. For "parallel" the largest pool worker's peak
+is reported as well.
+
+    python benchmarks/pdf_extraction.py --pages 200,1000,3000
+    python benchmarks/pdf_extraction.py --workers 4 --modes stream,parallel
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from _common import use_scratch_dir, synthetic_clause, peak_rss_mb
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", default="200,1000")
+    parser.add_argument("--modes", default="load,stream,parallel")
+    parser.add_argument("--workers", type=int, default=max(2, min(4, os.cpu_count() or 1)))
+    parser.add_argument("--lines-per-page", type=int, default=45)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "PDF"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def write_pdf(path: str, pages: int, lines_per_page: int, rng: random.Random):
+    """
+    Streams out a plain PDF (Helvetica text pages, no compression) without
+    holding more than one page in memory.
+    """
+    offsets = {}
+    with open(path, "wb") as f:
+        def obj(number, body: bytes):
+            offsets[number] = f.tell()
+            f.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(pages))
+        obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+        obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        for i in range(pages):
+            lines = [f"Page {i + 1}. Clause {i + 1}.{n}: {synthetic_clause(rng, 12)}" for n in range(lines_per_page)]
+            text = " Tj T* ".join(f"({line})" for line in lines)
+            stream = f"BT /F1 9 Tf 11 TL 40 800 Td {text} Tj ET".encode()
+            obj(4 + 2 * i, f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                           f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode())
+            obj(5 + 2 * i, f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+        xref = f.tell()
+        count = 4 + 2 * pages - 1
+        f.write(f"xref\n0 {count + 1}\n0000000000 65535 f \n".encode())
+        for number in range(1, count + 1):
+            f.write(f"{offsets[number]:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {count + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+def run_mode(mode: str, pdf_path: str, workers: int) -> dict:
+    from services.pdf_extractor import iter_pdf_pages
+
+    start = time.perf_counter()
+    pages = chars = 0
+    if mode == "load":
+        from langchain_community.document_loaders import PyPDFLoader
+        documents = PyPDFLoader(pdf_path).load()
+        full_text = "\n".join(document.page_content for document in documents)
+        pages, chars = len(documents), len(full_text)
+    else:
+        for page in iter_pdf_pages(pdf_path, workers=workers if mode == "parallel" else 0):
+            pages += 1
+            chars += len(page.page_content)
+    elapsed = time.perf_counter() - start
+    # Pool workers only count towards RUSAGE_CHILDREN once they have exited
+    from services import pdf_extractor
+    if pdf_extractor._pool is not None:
+        pdf_extractor._pool.shutdown()
+    return {
+        "pages": pages, "chars": chars, "seconds": elapsed,
+        "peak_rss_mb": peak_rss_mb(), "worker_peak_rss_mb": peak_rss_mb(children=True),
+    }
+
+def main():
+    args = parse_args()
+    if args.run:
+        mode, pdf_path = args.run
+        print(json.dumps(run_mode(mode, pdf_path, args.workers)))
+        return
+
+    workdir = use_scratch_dir()
+    rng = random.Random(args.seed)
+    modes = args.modes.split(",")
+    print(f"⏱️ PDF extraction, {args.lines_per_page} lines per page, {args.workers} workers for 'parallel'")
+    for pages in (int(count) for count in args.pages.split(",")):
+        pdf_path = os.path.join(workdir, f"contract-{pages}.pdf")
+        write_pdf(pdf_path, pages, args.lines_per_page, rng)
+        print(f"\n  {pages} pages ({os.path.getsize(pdf_path) / 1024 ** 2:.1f} MB)")
+        for mode in modes:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--workers", str(args.workers), "--run", mode, pdf_path],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            workers_rss = f", pool worker peak {result['worker_peak_rss_mb']:6.1f} MB" if mode == "parallel" else ""
+            print(f"    {mode:<9} {result['pages'] / result['seconds']:8.1f} pages/s  "
+                  f"peak RSS {result['peak_rss_mb']:6.1f} MB{workers_rss}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Cross-encoder re-rank latency against candidate pool size, for each
+RERANK_BATCH_SIZE given.
+
+Candidates are synthetic chunks of about the splitter's size, so the
+numbers are per query on the CPU the API runs on.
+
+    python benchmarks/rerank_latency.py --pools 10,20,50,100 --batch-sizes 8,16,32
+    RERANK_MODEL=cross-encoder/ms-marco-TinyBERT-L-2-v2 python benchmarks/rerank_latency.py
+"""
+import argparse
+import random
+import sys
+import time
+from _common import use_scratch_dir, synthetic_clause, synthetic_query, latency_line, quiet
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pools", default="10,20,50,100,200")
+    parser.add_argument("--batch-sizes", default="16")
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--k", type=int, default=4, help="chunks kept")
+    parser.add_argument("--words-per-chunk", type=int, default=160)
+    parser.add_argument("--fake-model", action="store_true",
+                        help="word-overlap scorer instead of the cross-encoder, to check the script offline")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+class WordOverlapScorer:
+    def predict(self, pairs, batch_size=16, show_progress_bar=False):
+        scores = []
+        for start in range(0, len(pairs), batch_size):
+            for query, text in pairs[start:start + batch_size]:
+                words = set(query.lower().split())
+                scores.append(sum(word in words for word in text.lower().split()))
+        return scores
+
+def main():
+    args = parse_args()
+    use_scratch_dir()
+
+    from langchain_core.documents import Document
+    from services import reranker
+
+    if args.fake_model:
+        reranker._model = WordOverlapScorer()
+    elif not reranker.get_cross_encoder():
+        sys.exit(f"❌ Could not load {reranker.RERANK_MODEL}; pass --fake-model to run without it")
+
+    rng = random.Random(args.seed)
+    pools = [int(size) for size in args.pools.split(",")]
+    corpus = [Document(page_content=synthetic_clause(rng, args.words_per_chunk)) for _ in range(max(pools))]
+    queries = [synthetic_query(rng) for _ in range(args.queries)]
+    # First forward pass allocates the model's buffers
+    reranker.rerank(queries[0], corpus[:2], 1)
+
+    model = "word overlap (fake)" if args.fake_model else reranker.RERANK_MODEL
+    print(f"⏱️ Re-rank latency per query, {model}, keep {args.k}, {args.words_per_chunk} words per chunk")
+    for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+        reranker.RERANK_BATCH_SIZE = batch_size
+        print(f"\n  batch size {batch_size}")
+        for pool in pools:
+            samples = []
+            with quiet():
+                for query in queries:
+                    candidates = rng.sample(corpus, pool)
+                    start = time.perf_counter()
+                    reranker.rerank(query, candidates, args.k)
+                    samples.append(time.perf_counter() - start)
+            print(f"    pool {pool:>4}  {latency_line(samples)}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
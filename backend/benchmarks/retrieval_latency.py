@@ -0,0 +1,118 @@
+"""
+p50/p99 retrieval latency of the chat path, before and after the shared
+vector store handle.
+
+"before" reopens the persisted store for every question and runs the old
+dense-only top-k, the way the old get_vector_db() did; "after" goes through rag_service.retrieve() on the
+process-wide handle and cached per-case retrievers, and "chat" times the
+whole get_chat_response() with the fake LLM and the query cache off, so
+only retrieval and prompt building are measured.
+
+    python benchmarks/retrieval_latency.py --chunks 5000 --queries 300
+    python benchmarks/retrieval_latency.py --backend mmap --fake-embeddings
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from _common import use_scratch_dir, use_fake_embeddings, synthetic_clause, synthetic_query, latency_line, quiet
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backend", choices=["chroma", "mmap"], default="chroma")
+    parser.add_argument("--cases", type=int, default=5)
+    parser.add_argument("--chunks", type=int, default=2000, help="chunks per case")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--fake-embeddings", action="store_true", help="hash embeddings instead of MiniLM")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+def seed_cases(rng, cases: int, chunks: int):
+    from langchain_core.documents import Document
+    from services.rag_service import add_documents_to_db
+    from services.lexical_index import add_document_chunks
+
+    case_ids = [f"bench-case-{i}" for i in range(cases)]
+    for case_id in case_ids:
+        doc_id = f"{case_id}-doc"
+        splits, lexical_chunks = [], []
+        for position in range(chunks):
+            metadata = {"case_id": case_id, "doc_id": doc_id, "chunk_id": f"{doc_id}:{position}", "page": position // 4}
+            text = synthetic_clause(rng)
+            splits.append(Document(page_content=text, metadata=metadata))
+            lexical_chunks.append({"chunk_id": metadata["chunk_id"], "text": text, "metadata": dict(metadata)})
+        for start in range(0, len(splits), 256):
+            add_documents_to_db(splits[start:start + 256])
+        add_document_chunks(case_id, doc_id, lexical_chunks)
+    return case_ids
+
+def time_calls(fn, questions):
+    samples = []
+    with quiet():
+        for case_id, question in questions:
+            start = time.perf_counter()
+            fn(case_id, question)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+async def time_chat(get_chat_response, questions):
+    samples = []
+    with quiet():
+        for case_id, question in questions:
+            start = time.perf_counter()
+            await get_chat_response(case_id, question)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+def main():
+    args = parse_args()
+    use_scratch_dir()
+    os.environ["VECTOR_BACKEND"] = args.backend
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_TOKEN_DELAY"] = "0"
+    os.environ["QUERY_CACHE_ENABLED"] = "false"
+    if args.fake_embeddings:
+        use_fake_embeddings()
+
+    from services import rag_service
+    from services.llm_service import get_chat_response
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    rag_service.init_vector_db()
+    with quiet():
+        case_ids = seed_cases(rng, args.cases, args.chunks)
+    print(f"✅ Indexed {args.cases} x {args.chunks} chunks ({args.backend}) in {time.perf_counter() - start:.1f}s")
+
+    # Distinct questions per run so the embedding cache doesn't answer them
+    def questions(label):
+        return [(rng.choice(case_ids), f"{synthetic_query(rng)} [{label} {i}]") for i in range(args.queries)]
+
+    def before(case_id, question):
+        if args.backend == "mmap":
+            from services.vector_store import MmapVectorStore
+            db = MmapVectorStore(rag_service.get_embeddings())
+        else:
+            from langchain_community.vectorstores import Chroma
+            db = Chroma(persist_directory=rag_service.CHROMA_DB_DIR, embedding_function=rag_service.get_embeddings())
+        db.as_retriever(search_kwargs={"k": rag_service.RETRIEVAL_K, "filter": {"case_id": case_id}}).invoke(question)
+
+    def after(case_id, question):
+        rag_service.retrieve(case_id, question)
+
+    results = {}
+    for label, fn in (("before (client per call)", before), ("after (shared handle)", after)):
+        time_calls(fn, questions(f"warmup {label}")[:args.warmup])
+        results[label] = time_calls(fn, questions(label))
+    label = "chat (get_chat_response)"
+    asyncio.run(time_chat(get_chat_response, questions(f"warmup {label}")[:args.warmup]))
+    results[label] = asyncio.run(time_chat(get_chat_response, questions(label)))
+
+    print(f"\n⏱️ Retrieval latency, {args.backend}, hybrid={rag_service.HYBRID_SEARCH}")
+    for label, samples in results.items():
+        print(f"  {label:<26} {latency_line(samples)}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
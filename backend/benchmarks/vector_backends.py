@@ -0,0 +1,160 @@
+"""
+Chroma against the memory-mapped per-case store (exact and HNSW search) on
+recall@k, query latency and memory.
+
+Vectors are synthetic (clustered unit vectors with the embedding's
+dimension), handed to the stores through a lookup "embedding", so no model
+runs and every backend indexes exactly the same data. Each backend builds
+its index in one process and is queried from a fresh one, so "serving RSS"
+is what an API worker holding that index would use. Recall is against
+brute-force cosine top-k within the query's case.
+
+    python benchmarks/vector_backends.py --cases 20 --rows 5000
+    python benchmarks/vector_backends.py --backends mmap-exact,mmap-hnsw --rows 50000 --cases 2
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+from _common import use_scratch_dir, latency_line, peak_rss_mb, current_rss_mb, quiet
+
+BACKENDS = ("chroma", "mmap-exact", "mmap-hnsw")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--cases", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=5000, help="rows per case")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--run", nargs=3, metavar=("BACKEND", "PHASE", "DATA"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def make_dataset(path: str, args):
+    rng = np.random.default_rng(args.seed)
+    total = args.cases * args.rows
+    # Clause-like clusters: many chunks sit close to a few topics
+    centers = rng.standard_normal((max(8, args.rows // 50), args.dim)).astype(np.float32)
+    vectors = centers[rng.integers(len(centers), size=total)] + 0.6 * rng.standard_normal((total, args.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picks = rng.integers(total, size=args.queries)
+    queries = vectors[picks] + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    np.savez(path, vectors=vectors, queries=queries, query_cases=picks // args.rows, rows=args.rows, k=args.k)
+
+def lookup_embeddings(vectors):
+    from langchain_core.embeddings import Embeddings
+
+    class LookupEmbeddings(Embeddings):
+        """
+        "row-<n>" -> the dataset's n-th vector.
+        """
+        def embed_documents(self, texts):
+            return [vectors[int(text.split("-")[1])].tolist() for text in texts]
+
+        def embed_query(self, text):
+            return self.embed_documents([text])[0]
+
+    return LookupEmbeddings()
+
+def store_opener(backend: str):
+    """
+    Imports the backend and returns a function opening its persisted store.
+    """
+    if backend == "chroma":
+        from langchain_community.vectorstores import Chroma
+        return lambda embeddings: Chroma(persist_directory="./chroma_db", embedding_function=embeddings)
+    from services.vector_store import MmapVectorStore
+    return MmapVectorStore
+
+def directory_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / 1024 ** 2
+
+def build(backend: str, data) -> dict:
+    vectors, rows = data["vectors"], int(data["rows"])
+    store = store_opener(backend)(lookup_embeddings(vectors))
+    start = time.perf_counter()
+    with quiet():
+        for offset in range(0, len(vectors), 1000):
+            ids = [f"row-{i}" for i in range(offset, min(offset + 1000, len(vectors)))]
+            store.add_texts(ids, metadatas=[{"case_id": f"case-{int(i.split('-')[1]) // rows}"} for i in ids], ids=ids)
+    elapsed = time.perf_counter() - start
+    index_dir = "./chroma_db" if backend == "chroma" else "./vector_index"
+    return {"build_seconds": elapsed, "disk_mb": directory_mb(index_dir), "build_peak_rss_mb": peak_rss_mb()}
+
+def query(backend: str, data) -> dict:
+    vectors, queries, query_cases = data["vectors"], data["queries"], data["query_cases"]
+    rows, k = int(data["rows"]), int(data["k"])
+    open_store = store_opener(backend)
+    # Neither the dataset nor the imported libraries count towards the index
+    baseline = current_rss_mb()
+    store = open_store(lookup_embeddings(vectors))
+
+    latencies, recalls = [], []
+    for query_vector, case in zip(queries, query_cases):
+        case_rows = vectors[case * rows:(case + 1) * rows]
+        truth = set(np.argsort(-(case_rows @ query_vector))[:k] + case * rows)
+        start = time.perf_counter()
+        docs = store.similarity_search_by_vector(query_vector.tolist(), k=k, filter={"case_id": f"case-{case}"})
+        latencies.append(time.perf_counter() - start)
+        found = {int(doc.page_content.split("-")[1]) for doc in docs}
+        recalls.append(len(found & truth) / k)
+    return {
+        "latencies": latencies,
+        "recall": float(np.mean(recalls)),
+        "serving_rss_mb": current_rss_mb() - baseline,
+        "query_peak_rss_mb": peak_rss_mb(),
+    }
+
+def run_child(backend: str, phase: str, data_path: str, workdir: str) -> dict:
+    env = dict(os.environ, VECTOR_SEARCH="hnsw" if backend == "mmap-hnsw" else "exact")
+    # Builds the graph at any size, so small runs still compare HNSW
+    env.setdefault("HNSW_MIN_ROWS", "0")
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run", backend, phase, data_path],
+        cwd=os.path.join(workdir, backend), env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    args = parse_args()
+    if args.run:
+        backend, phase, data_path = args.run
+        data = np.load(data_path)
+        print(json.dumps(build(backend, data) if phase == "build" else query(backend, data)))
+        return
+
+    workdir = use_scratch_dir()
+    data_path = os.path.join(workdir, "dataset.npz")
+    make_dataset(data_path, args)
+    backends = args.backends.split(",")
+    if "mmap-hnsw" in backends:
+        try:
+            import hnswlib  # noqa: F401
+        except ImportError:
+            print("⚠️ hnswlib is not installed; skipping mmap-hnsw.")
+            backends.remove("mmap-hnsw")
+
+    print(f"⏱️ {args.cases} cases x {args.rows} rows, dim {args.dim}, {args.queries} queries, recall@{args.k}")
+    for backend in backends:
+        os.makedirs(os.path.join(workdir, backend))
+        built = run_child(backend, "build", data_path, workdir)
+        queried = run_child(backend, "query", data_path, workdir)
+        print(f"\n  {backend}")
+        print(f"    recall@{args.k}  {queried['recall']:.3f}")
+        print(f"    query      {latency_line(queried['latencies'])}")
+        print(f"    build      {built['build_seconds']:.1f}s, {args.cases * args.rows / built['build_seconds']:.0f} rows/s, "
+              f"{built['disk_mb']:.1f} MB on disk")
+        print(f"    memory     serving +{queried['serving_rss_mb']:.1f} MB after {args.queries} queries, "
+              f"peak RSS build {built['build_peak_rss_mb']:.0f} MB / query {queried['query_peak_rss_mb']:.0f} MB")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
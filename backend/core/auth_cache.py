@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+from models.models import User
+
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Upper bound on how long a verified token or user record is trusted without
+# going back to the JWT/database; tokens also drop out at their `exp`
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+
+class TTLCache:
+    """
+    Thread-safe in-memory LRU with a per-entry expiry time.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value), most recently used last
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, expires_at: Optional[float] = None):
+        ttl_expiry = time.time() + self.ttl_seconds
+        expires_at = min(expires_at, ttl_expiry) if expires_at is not None else ttl_expiry
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+# token -> user_id, and user_id -> detached User snapshot
+_tokens = TTLCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+_users = TTLCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+
+def token_user_id(token: str) -> Optional[str]:
+    return _tokens.get(token)
+
+def remember_token(token: str, user_id: str, exp: Optional[float]):
+    _tokens.set(token, user_id, expires_at=exp)
+
+def get_user(user_id: str) -> Optional[User]:
+    return _users.get(user_id)
+
+def remember_user(user: User):
+    """
+    Caches a copy of the user's columns (without the password hash) that
+    isn't tied to the request's session, so it can be shared by requests.
+    """
+    snapshot = User(**{
+        column.key: getattr(user, column.key)
+        for column in User.__table__.columns if column.key != "password_hash"
+    })
+    make_transient_to_detached(snapshot)
+    _users.set(user.id, snapshot)
+
+def invalidate_user(user_id: str):
+    _users.pop(user_id)
+
+def get_auth_cache_stats():
+    return {"tokens": _tokens.stats(), "users": _users.stats()}
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    # Any ORM change to a user drops their cached record in this process
+    invalidate_user(target.id)
\ No newline at end of file
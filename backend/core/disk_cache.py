@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+class DiskCache:
+    """
+    Small persistent key/value cache on local disk, backed by SQLite so it is
+    shared safely between threads and worker processes.
+
+    Entries are evicted least-recently-used once there are more than
+    `max_entries`, and expire after `ttl_seconds` if one is given. An optional
+    tag lets callers drop a group of entries at once (e.g. everything for a case).
+    """
+
+    # Eviction scans the table, so only do it every N writes
+    EVICT_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                tag TEXT,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_accessed_at ON entries (accessed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_tag ON entries (tag)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hits: int, misses: int):
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys) -> dict:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        conn = self._conn()
+        now = time.time()
+        found = {}
+        # SQLite caps the number of bound parameters per statement
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = conn.execute(
+                f"SELECT key, value, created_at FROM entries WHERE key IN ({placeholders})", part
+            ).fetchall()
+            for key, value, created_at in rows:
+                if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                    continue
+                found[key] = value
+
+        if found:
+            conn.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                [(now, key) for key in found]
+            )
+            conn.commit()
+        self._count(len(found), len(keys) - len(found))
+        return found
+
+    def set(self, key: str, value: bytes, tag: Optional[str] = None):
+        self.set_many({key: value}, tag=tag)
+
+    def set_many(self, items: dict, tag: Optional[str] = None):
+        if not items:
+            return
+        conn = self._conn()
+        now = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO entries (key, value, tag, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            [(key, value, tag, now, now) for key, value in items.items()]
+        )
+        conn.commit()
+
+        with self._stats_lock:
+            self._writes += len(items)
+            should_evict = self._writes >= self.EVICT_EVERY
+            if should_evict:
+                self._writes = 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        conn = self._conn()
+        if self.ttl_seconds is not None:
+            conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        cursor = conn.execute(
+            "DELETE FROM entries WHERE key IN "
+            "(SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        conn.commit()
+        with self._stats_lock:
+            self.evictions += max(cursor.rowcount, 0)
+
+    def get_tag(self, tag: str, limit: Optional[int] = None) -> dict:
+        """
+        Unexpired entries with a tag, most recently used first. Doesn't touch
+        hit/miss counters or recency; callers `get` the entry they end up using.
+        """
+        query = "SELECT key, value FROM entries WHERE tag = ?"
+        params = [tag]
+        if self.ttl_seconds is not None:
+            query += " AND created_at >= ?"
+            params.append(time.time() - self.ttl_seconds)
+        query += " ORDER BY accessed_at DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return dict(self._conn().execute(query, params).fetchall())
+
+    def invalidate_tag(self, tag: str) -> int:
+        conn = self._conn()
+        cursor = conn.execute("DELETE FROM entries WHERE tag = ?", (tag,))
+        conn.commit()
+        return max(cursor.rowcount, 0)
+
+    def stats(self) -> dict:
+        entries = self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
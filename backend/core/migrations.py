@@ -0,0 +1,23 @@
+from sqlalchemy import inspect, text
+from models.models import Base
+
+def add_missing_columns(engine):
+    """
+    Adds model columns that an existing table doesn't have yet. create_all
+    only creates missing tables, so columns added to a model after its table
+    was first created would otherwise never reach the database. New columns
+    are added as nullable; rows written before them read as NULL.
+    """
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"))
+                print(f"✅ Added column {table.name}.{column.name}")
\ No newline at end of file
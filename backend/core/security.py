@@ -1,13 +1,35 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from jose import jwt
+import asyncio
 import bcrypt  
+import multiprocessing
 import os
+import threading
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Cost factor for new hashes; existing hashes are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt runs in its own process pool so a login burst can't starve the
+# event loop or the request threadpool. 0 hashes in the request threadpool.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Hash/verify calls allowed in flight (running or queued); beyond this
+# login and register are refused instead of queueing without bound
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+class PasswordHashingBusy(Exception):
+    pass
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(
         plain_password.encode('utf-8'), 
@@ -16,10 +38,87 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     pwd_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed_bytes = bcrypt.hashpw(pwd_bytes, salt)
     return hashed_bytes.decode('utf-8')
 
+def hash_rounds(hashed_password: str) -> int:
+    # "$2b$12$<salt+hash>"
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+def needs_rehash(hashed_password: str) -> bool:
+    return hash_rounds(hashed_password) != BCRYPT_ROUNDS
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+def _discard_pool(broken):
+    """
+    Drops a pool whose worker died (OOM kill, crash): once broken, a
+    ProcessPoolExecutor fails every call. The next _get_pool() builds a
+    new one. Only the caller that still sees `broken` installed drops it.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+            broken.shutdown(wait=False, cancel_futures=True)
+            print("⚠️ Password hashing pool broke; starting a new one.")
+
+async def _run_in_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    if PASSWORD_HASH_WORKERS <= 0:
+        return await loop.run_in_executor(None, fn, *args)
+    pool = _get_pool()
+    try:
+        return await loop.run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        # Retry once on a fresh pool
+        _discard_pool(pool)
+        return await loop.run_in_executor(_get_pool(), fn, *args)
+
+async def _run_bounded(fn, *args):
+    """
+    Runs a bcrypt call off the event loop, or raises PasswordHashingBusy if
+    PASSWORD_HASH_MAX_PENDING calls are already in flight.
+    """
+    global _pending
+    with _pending_lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            raise PasswordHashingBusy()
+        _pending += 1
+    try:
+        return await _run_in_pool(fn, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_bounded(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_bounded(get_password_hash, password)
+
+def get_password_hash_stats():
+    with _pending_lock:
+        return {
+            "pending": _pending,
+            "max_pending": PASSWORD_HASH_MAX_PENDING,
+            "workers": PASSWORD_HASH_WORKERS,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+        }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -1,11 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth, cases, chat, documents, strategy
+from routers import auth, cases, chat, documents, strategy, jobs
+from services.rag_service import start_vector_db_warm_up, is_vector_db_ready, get_embedding_cache_stats
+from services.job_queue import start_workers, stop_workers
+from services.document_service import start_legacy_backfill
+from services.llm_cache import get_llm_cache_stats
+from services.query_cache import get_query_cache_stats
+from services.reclaim_service import get_reclaim_stats
+from core.auth_cache import get_auth_cache_stats
+from core.security import get_password_hash_stats
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load embeddings + vector store in the background so routes that don't
+    # need them (auth, case listing) are served right away
+    start_vector_db_warm_up()
+    # Databases from before document_contents: move their text over in the
+    # background, batch by batch, without delaying the first request
+    start_legacy_backfill()
+    # Document processing runs on a bounded pool of queue workers
+    start_workers()
+    yield
+    stop_workers()
 
 app = FastAPI(
     title="LexGuard API",
     description="Backend for LexGuard AI Corporate Lawyer",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 origins = [
@@ -26,11 +50,29 @@ app.include_router(auth.router)
 app.include_router(cases.router)
 app.include_router(chat.router)
 app.include_router(documents.router)
+app.include_router(jobs.router)
 
 @app.get("/")
 async def root():
     return {"message": "LexGuard API is running"}
 
+@app.get("/ready")
+async def readiness():
+    if not is_vector_db_ready():
+        return JSONResponse(status_code=503, content={"status": "warming_up", "vector_db": False})
+    return {"status": "ready", "vector_db": True}
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "embedding_cache": get_embedding_cache_stats(),
+        "llm_cache": get_llm_cache_stats(),
+        "query_cache": get_query_cache_stats(),
+        "reclaimer": get_reclaim_stats(),
+        "auth_cache": get_auth_cache_stats(),
+        "password_hashing": get_password_hash_stats()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="localhost", port=8000, reload=True)
\ No newline at end of file
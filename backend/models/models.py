@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, ForeignKey, Boolean, DateTime, Text, BigInteger, JSON
+from sqlalchemy import Column, String, ForeignKey, Boolean, DateTime, Text, BigInteger, JSON, Integer, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 import uuid
@@ -26,36 +26,79 @@ class Company(Base):
 class Case(Base):
     __tablename__ = "cases"
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    company_id = Column(String, ForeignKey("companies.id"))
+    company_id = Column(String, ForeignKey("companies.id"), index=True)
     title = Column(String)
     category = Column(String) 
     status = Column(String, default="intake")
     jurisdiction = Column(String, default="IN")
     amount = Column(BigInteger, nullable=True)
     risk_level = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    digest_json = Column(JSON, nullable=True)
+    strategy = Column(Text, nullable=True)
+    strategy_inputs_hash = Column(String, nullable=True)
+    strategy_updated_at = Column(DateTime, nullable=True)
+    chat_summary = Column(Text, nullable=True)
+    chat_summary_until = Column(DateTime, nullable=True)
+    # Set by DELETE; the row and everything it owns are reclaimed in the background
+    deleted_at = Column(DateTime, nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     messages = relationship("CaseMessage", back_populates="case")
     documents = relationship("Document", back_populates="case")
 
 class CaseMessage(Base):
     __tablename__ = "case_messages"
+    # Messages are always read per case in time order (history, paging)
+    __table_args__ = (Index("ix_case_messages_case_id_created_at", "case_id", "created_at"),)
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     case_id = Column(String, ForeignKey("cases.id"))
     sender = Column(String)
     content = Column(Text)
+    token_count = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     case = relationship("Case", back_populates="messages")
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (Index("ix_documents_case_id_created_at", "case_id", "created_at"),)
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     case_id = Column(String, ForeignKey("cases.id"))
     filename = Column(String)
     s3_key = Column(String)
-    extracted_text = Column(Text)
-    analysis_json = Column(JSON)
+    content_hash = Column(String, index=True, nullable=True)
+    # Extracted text and the full analysis live in document_contents
+    summary_json = Column(JSON, nullable=True)
+    status = Column(String, default="processing")  # processing / processed / partial / failed
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    case = relationship("Case", back_populates="documents")
\ No newline at end of file
+    case = relationship("Case", back_populates="documents")
+
+class DocumentContent(Base):
+    """
+    A document's large payloads, zlib-compressed and kept out of the
+    documents row so listing and filtering documents never reads them.
+    """
+    __tablename__ = "document_contents"
+    document_id = Column(String, ForeignKey("documents.id"), primary_key=True)
+    extracted_text = Column(LargeBinary, nullable=True)  # UTF-8 text
+    analysis_json = Column(LargeBinary, nullable=True)  # JSON
+    text_length = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String)
+    payload = Column(JSON, default=dict)
+    batch_id = Column(String, nullable=True, index=True)  # set for bulk uploads
+    status = Column(String, default="queued", index=True)  # queued / running / succeeded / failed
+    stage = Column(String, nullable=True)
+    progress = Column(Integer, default=0)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
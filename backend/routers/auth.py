@@ -1,9 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from core.database import get_db
 from models.models import User
-from core.security import get_password_hash, verify_password, create_access_token, SECRET_KEY, ALGORITHM
+from core import auth_cache
+from core.security import (
+    get_password_hash_async, verify_password_async, needs_rehash, PasswordHashingBusy,
+    create_access_token, SECRET_KEY, ALGORITHM
+)
 from jose import JWTError, jwt
 from datetime import timedelta
 
@@ -11,35 +16,61 @@ router = APIRouter(prefix="/api/auth", tags=["Auth"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+def _busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in attempts right now, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
 # 1. REGISTER
 @router.post("/register")
-async def register_user(payload: dict, db: Session = Depends(get_db)):
+async def register_user(payload: dict, db: AsyncSession = Depends(get_db)):
     email = payload.get("email")
     password = payload.get("password")
     name = payload.get("name")
     
     # Check if user exists
-    user = db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
     if user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Create new user
+    # Create new user (bcrypt is slow, keep it off the event loop)
+    try:
+        password_hash = await get_password_hash_async(password)
+    except PasswordHashingBusy:
+        raise _busy_exception()
     new_user = User(
         email=email,
         name=name,
-        password_hash=get_password_hash(password) 
+        password_hash=password_hash
     )
     db.add(new_user)
-    db.commit()
+    await db.commit()
     return {"message": "User created successfully"}
 
 # 2. LOGIN (Returns Token)
 @router.post("/login")
-async def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     # Verify user
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    result = await db.execute(select(User).where(User.email == form_data.username))
+    user = result.scalars().first()
+    try:
+        verified = user is not None and await verify_password_async(form_data.password, user.password_hash)
+    except PasswordHashingBusy:
+        raise _busy_exception()
+    if not verified:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+
+    # BCRYPT_ROUNDS changed since this hash was made: upgrade it while we
+    # have the plain password. Skipped under load; the next login retries.
+    if needs_rehash(user.password_hash):
+        try:
+            user.password_hash = await get_password_hash_async(form_data.password)
+            await db.commit()
+        except PasswordHashingBusy:
+            pass
     
     # Generate Token
     access_token = create_access_token(
@@ -49,23 +80,49 @@ async def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Sessi
     return {"access_token": access_token, "token_type": "bearer"}
 
 # 3. GET CURRENT USER (Dependency for protected routes)
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def _load_user(db: AsyncSession, payload: dict):
+    # Tokens carry the user id; older ones only have the email in `sub`
+    user_id = payload.get("user_id")
+    if user_id:
+        return await db.get(User, user_id)
+    email = payload.get("sub")
+    if email is None:
+        return None
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    """
+    Resolves the bearer token to a user. Verified tokens and user records
+    are cached in-process (see core/auth_cache.py), so a repeat request
+    neither decodes the JWT nor touches the database.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    user_id = auth_cache.token_user_id(token)
+    if user_id is not None:
+        user = auth_cache.get_user(user_id)
+        if user is not None:
+            return user
+        user = await db.get(User, user_id)
+        if user is None:
+            raise credentials_exception
+        auth_cache.remember_user(user)
+        return user
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
         
-    user = db.query(User).filter(User.email == email).first()
+    user = await _load_user(db, payload)
     if user is None:
         raise credentials_exception
+    auth_cache.remember_token(token, user.id, payload.get("exp"))
+    auth_cache.remember_user(user)
     return user
 
 @router.get("/me")
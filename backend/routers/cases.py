@@ -1,21 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
 from core.database import get_db
-from models.models import Case, User
+from models.models import Case, CaseMessage, Document, DocumentContent, User
 from routers.auth import get_current_user
-import os
-from models.models import CaseMessage, Document
-from services.rag_service import delete_case_vectors
+from services.job_queue import new_job
+from services.document_content import content_to_dict
 
 router = APIRouter(
     prefix="/api/cases",
     tags=["Cases"]
 )
 
+PAGE_SIZE_DEFAULT = 20
+PAGE_SIZE_MAX = 100
+
+# Only what the list and detail views show; digest, strategy and chat summary
+# have their own routes
+CASE_LIST_COLUMNS = (Case.id, Case.title, Case.category, Case.status, Case.risk_level, Case.created_at)
+CASE_DETAIL_COLUMNS = CASE_LIST_COLUMNS + (
+    Case.company_id, Case.jurisdiction, Case.amount, Case.strategy_updated_at
+)
+MESSAGE_COLUMNS = (CaseMessage.id, CaseMessage.sender, CaseMessage.content, CaseMessage.created_at)
+DOCUMENT_COLUMNS = (
+    Document.id, Document.filename, Document.status, Document.summary_json, Document.created_at
+)
+
+def _encode_cursor(created_at: datetime, row_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), row_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _keyset_page(db: AsyncSession, query, model, limit: int, cursor: Optional[str]):
+    """
+    One page of `query`, newest first, using keyset pagination on
+    (created_at, id): each page starts strictly after the last row of the
+    previous one, so deep pages cost the same as the first.
+    """
+    if cursor:
+        created_at, row_id = _decode_cursor(cursor)
+        query = query.where(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+    query = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return {"items": [dict(row) for row in rows], "next_cursor": next_cursor}
+
+async def get_active_case(db: AsyncSession, case_id: str):
+    """
+    The case, or None if it doesn't exist or has been deleted.
+    """
+    case = await db.get(Case, case_id)
+    if case is None or case.deleted_at is not None:
+        return None
+    return case
+
 @router.post("/")
 async def create_case(
     payload: dict, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     new_case = Case(
@@ -25,51 +85,98 @@ async def create_case(
     )
     
     db.add(new_case)
-    db.commit()
-    db.refresh(new_case)
+    await db.commit()
+    await db.refresh(new_case)
     
     return new_case
 
 @router.get("/")
-async def list_cases(db: Session = Depends(get_db)):
-    return db.query(Case).order_by(Case.created_at.desc()).all()
+async def list_cases(
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Newest cases first, one page at a time. Pass `next_cursor` from the
+    previous page as `cursor` to get the next one.
+    """
+    query = select(*CASE_LIST_COLUMNS).where(Case.deleted_at.is_(None))
+    return await _keyset_page(db, query, Case, limit, cursor)
 
 @router.get("/{case_id}")
-async def get_case_details(case_id: str, db: Session = Depends(get_db)):
-    case = db.query(Case)\
-        .options(joinedload(Case.messages), joinedload(Case.documents))\
-        .filter(Case.id == case_id)\
-        .first()
+async def get_case_details(case_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    The case's own fields only; messages and documents are paged from
+    their sub-resources.
+    """
+    result = await db.execute(
+        select(*CASE_DETAIL_COLUMNS).where(Case.id == case_id, Case.deleted_at.is_(None))
+    )
+    case = result.mappings().first()
         
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
     return case
 
+@router.get("/{case_id}/messages")
+async def list_case_messages(
+    case_id: str,
+    limit: int = Query(50, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Newest messages first; follow `next_cursor` for older ones.
+    """
+    if not await get_active_case(db, case_id):
+        raise HTTPException(status_code=404, detail="Case not found")
+    query = select(*MESSAGE_COLUMNS).where(CaseMessage.case_id == case_id)
+    return await _keyset_page(db, query, CaseMessage, limit, cursor)
+
+@router.get("/{case_id}/documents")
+async def list_case_documents(
+    case_id: str,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    include_text: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Newest documents first. Extracted text and the full analysis are only
+    included with `include_text=true`.
+    """
+    if not await get_active_case(db, case_id):
+        raise HTTPException(status_code=404, detail="Case not found")
+    query = select(*DOCUMENT_COLUMNS).where(Document.case_id == case_id)
+    page = await _keyset_page(db, query, Document, limit, cursor)
+    if include_text and page["items"]:
+        result = await db.execute(
+            select(DocumentContent)
+            .where(DocumentContent.document_id.in_([item["id"] for item in page["items"]]))
+        )
+        contents = {content.document_id: content for content in result.scalars().all()}
+        for item in page["items"]:
+            item.update(await run_in_threadpool(content_to_dict, contents.get(item["id"])))
+    return page
+
 @router.delete("/{case_id}")
 async def delete_case(
     case_id: str, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    case = db.query(Case).filter(Case.id == case_id).first()
+    """
+    Marks the case deleted, which hides it immediately, and queues a
+    reclaim_case job in the same transaction to remove its files, vectors
+    and rows in the background.
+    """
+    case = await get_active_case(db, case_id)
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
 
-    documents = db.query(Document).filter(Document.case_id == case_id).all()
-    for doc in documents:
-        if doc.s3_key and os.path.exists(doc.s3_key):
-            try:
-                os.remove(doc.s3_key)
-                print(f"Deleted file: {doc.s3_key}")
-            except Exception as e:
-                print(f"Error deleting file {doc.s3_key}: {e}")
-
-    delete_case_vectors(case_id)
-
-    db.query(CaseMessage).filter(CaseMessage.case_id == case_id).delete()
-    db.query(Document).filter(Document.case_id == case_id).delete()
-    
-    db.delete(case)
-    db.commit()
+    case.deleted_at = datetime.utcnow()
+    job = new_job("reclaim_case", {"case_id": case_id})
+    db.add(job)
+    await db.commit()
 
-    return {"message": "Case and all associated data deleted successfully"}
\ No newline at end of file
+    return {"message": "Case deleted; its data is being removed in the background", "job_id": job.id}
\ No newline at end of file
@@ -1,14 +1,59 @@
-from sqlalchemy.orm import Session
-from core.database import get_db
-from models.models import CaseMessage, Case
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_db, AsyncSessionLocal
+from models.models import CaseMessage
+from routers.cases import get_active_case
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from services.document_service import save_upload_file 
-from services.llm_service import get_chat_response, transcribe_audio
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from services.document_service import save_upload_file, release_upload
+from services.llm_service import get_chat_response, stream_chat_response, transcribe_audio
+from services.memory_service import load_chat_history, count_tokens
+import json
 
 router = APIRouter(prefix="/api/cases", tags=["Chat"])
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_ai_reply(case_id: str, query: str, history: str = "", first_events=()):
+    """
+    Server-sent events for one AI reply: any `first_events`, then `sources`,
+    a `token` event per chunk from the LLM, then `done` once the full answer
+    has been saved as a CaseMessage.
+    """
+    for event, data in first_events:
+        yield _sse(event, data)
+
+    parts = []
+    try:
+        async for event, data in stream_chat_response(case_id, query, history):
+            if event == "token":
+                parts.append(data)
+                data = {"token": data}
+            yield _sse(event, data)
+    except Exception as e:
+        print(f"Error in LLM streaming: {e}")
+        yield _sse("error", {"detail": "I encountered an error processing your request."})
+        if not parts:
+            return
+
+    ai_text = "".join(parts)
+    # The request's session is already closed by the time the stream finishes
+    async with AsyncSessionLocal() as db:
+        ai_msg = CaseMessage(case_id=case_id, sender="ai", content=ai_text, token_count=count_tokens(ai_text))
+        db.add(ai_msg)
+        await db.commit()
+    yield _sse("done", {"message_id": ai_msg.id, "ai_response": ai_text})
+
+def _event_stream(events):
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/{case_id}/messages")
-async def send_message(case_id: str, payload: dict, db: Session = Depends(get_db)):
+async def send_message(case_id: str, payload: dict, db: AsyncSession = Depends(get_db)):
     """
     Receives a user message, gets AI response, saves both to DB.
     """
@@ -16,39 +61,76 @@ async def send_message(case_id: str, payload: dict, db: Session = Depends(get_db
     if not user_content:
         raise HTTPException(status_code=400, detail="Message content is required")
 
-    case = db.query(Case).filter(Case.id == case_id).first()
+    case = await get_active_case(db, case_id)
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
 
+    # Earlier turns (recent ones verbatim, older ones summarized)
+    history = await load_chat_history(db, case)
+
     user_msg = CaseMessage(
         case_id=case_id,
         sender="user",
-        content=user_content
+        content=user_content,
+        token_count=count_tokens(user_content)
     )
     db.add(user_msg)
-    db.commit()
+    await db.commit()
 
-    ai_text = get_chat_response(case_id, user_content)
+    reply = await get_chat_response(case_id, user_content, history)
+    ai_text = reply["answer"]
 
     ai_msg = CaseMessage(
         case_id=case_id,
         sender="ai",
-        content=ai_text
+        content=ai_text,
+        token_count=count_tokens(ai_text)
     )
     db.add(ai_msg)
-    db.commit()
+    await db.commit()
 
     return {
         "user_message": user_msg.content,
-        "ai_response": ai_msg.content
+        "ai_response": ai_msg.content,
+        "sources": reply["sources"],
+        "cached": reply["cached"]
     }
 
 
+@router.post("/{case_id}/messages/stream")
+async def send_message_stream(case_id: str, payload: dict, db: AsyncSession = Depends(get_db)):
+    """
+    Streaming version of send_message: the AI answer is sent as server-sent
+    events while it is generated.
+    """
+    user_content = payload.get("content")
+    if not user_content:
+        raise HTTPException(status_code=400, detail="Message content is required")
+
+    case = await get_active_case(db, case_id)
+    if not case:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    # Earlier turns (recent ones verbatim, older ones summarized)
+    history = await load_chat_history(db, case)
+
+    user_msg = CaseMessage(
+        case_id=case_id,
+        sender="user",
+        content=user_content,
+        token_count=count_tokens(user_content)
+    )
+    db.add(user_msg)
+    await db.commit()
+
+    return _event_stream(_stream_ai_reply(case_id, user_content, history))
+
+
 @router.post("/{case_id}/voice")
 async def send_voice_message(
     case_id: str, 
     file: UploadFile = File(...), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     1. Upload Audio
@@ -56,38 +138,92 @@ async def send_voice_message(
     3. Process as normal Chat Message
     """
     # 1. Save Audio File Temporarily
-    file_path = await save_upload_file(file)
+    file_path, _, hold_path = await save_upload_file(file)
     
     # 2. Transcribe
-    transcribed_text = transcribe_audio(file_path)
+    try:
+        transcribed_text = await transcribe_audio(file_path)
+    finally:
+        await run_in_threadpool(release_upload, file_path, hold_path)
     if not transcribed_text:
         raise HTTPException(status_code=500, detail="Failed to transcribe audio")
         
     # 3. Save "User" Message (The transcribed text)
-    case = db.query(Case).filter(Case.id == case_id).first()
+    case = await get_active_case(db, case_id)
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
 
+    history = await load_chat_history(db, case)
+
+    voice_content = f"[Voice Input]: {transcribed_text}"
     user_msg = CaseMessage(
         case_id=case_id,
         sender="user", 
-        content=f"[Voice Input]: {transcribed_text}" 
+        content=voice_content,
+        token_count=count_tokens(voice_content)
     )
     db.add(user_msg)
-    db.commit()
+    await db.commit()
 
     # 4. Get AI Response (Same as text chat!)
-    ai_text = get_chat_response(case_id, transcribed_text)
+    reply = await get_chat_response(case_id, transcribed_text, history)
+    ai_text = reply["answer"]
 
     ai_msg = CaseMessage(
         case_id=case_id,
         sender="ai",
-        content=ai_text
+        content=ai_text,
+        token_count=count_tokens(ai_text)
     )
     db.add(ai_msg)
-    db.commit()
+    await db.commit()
 
     return {
         "transcription": transcribed_text,
-        "ai_response": ai_text
-    }
\ No newline at end of file
+        "ai_response": ai_text,
+        "sources": reply["sources"],
+        "cached": reply["cached"]
+    }
+
+
+@router.post("/{case_id}/voice/stream")
+async def send_voice_message_stream(
+    case_id: str, 
+    file: UploadFile = File(...), 
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Streaming version of send_voice_message: a `transcription` event first,
+    then the AI answer token by token.
+    """
+    file_path, _, hold_path = await save_upload_file(file)
+    
+    try:
+        transcribed_text = await transcribe_audio(file_path)
+    finally:
+        await run_in_threadpool(release_upload, file_path, hold_path)
+    if not transcribed_text:
+        raise HTTPException(status_code=500, detail="Failed to transcribe audio")
+        
+    case = await get_active_case(db, case_id)
+    if not case:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    history = await load_chat_history(db, case)
+
+    voice_content = f"[Voice Input]: {transcribed_text}"
+    user_msg = CaseMessage(
+        case_id=case_id,
+        sender="user", 
+        content=voice_content,
+        token_count=count_tokens(voice_content)
+    )
+    db.add(user_msg)
+    await db.commit()
+
+    return _event_stream(_stream_ai_reply(
+        case_id,
+        transcribed_text,
+        history,
+        first_events=[("transcription", {"transcription": transcribed_text})]
+    ))
@@ -1,31 +1,153 @@
-from fastapi import APIRouter, UploadFile, File, BackgroundTasks, Depends
-from sqlalchemy.orm import Session
+import uuid
+from typing import List
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from core.database import get_db
 from models.models import Document
-from services.document_service import save_upload_file, process_document
+from routers.cases import get_active_case
+from services.document_service import save_upload_file, save_bulk_upload, release_upload
+from services.job_queue import new_job
 
 router = APIRouter(prefix="/api/cases", tags=["Documents"])
 
+# Uploading the same bytes again retries these instead of being a no-op
+RETRYABLE_STATUSES = ("failed", "partial")
+
+def _requeue(doc: Document, file_path: str, batch_id: str = None):
+    """
+    Queues a new processing job for a document whose last attempt failed.
+    The caller adds the job and commits.
+    """
+    doc.status = "processing"
+    doc.s3_key = file_path
+    return new_job("process_document", {"file_path": file_path, "doc_id": doc.id}, batch_id=batch_id)
+
 @router.post("/{case_id}/documents")
 async def upload_document(
     case_id: str, 
-    background_tasks: BackgroundTasks, 
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    file_path = await save_upload_file(file)
-    
-    new_doc = Document(
-        case_id=case_id,
-        filename=file.filename,
-        s3_key=file_path, 
-        extracted_text="Processing...", 
-        analysis_json={}
-    )
-    db.add(new_doc)
-    db.commit()
-    db.refresh(new_doc)
+    if not await get_active_case(db, case_id):
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    file_path, content_hash, hold_path = await save_upload_file(file)
+    committed = False
+    try:
+        # The same bytes are already in this case: nothing new to index,
+        # unless processing them failed last time
+        result = await db.execute(
+            select(Document).where(Document.case_id == case_id, Document.content_hash == content_hash)
+        )
+        existing = result.scalars().first()
+        if existing and existing.status in RETRYABLE_STATUSES:
+            job = _requeue(existing, file_path)
+            db.add(job)
+            await db.commit()
+            committed = True
+            return {"message": "File re-uploaded and processing queued again", "doc_id": existing.id, "job_id": job.id}
+        if existing:
+            committed = True
+            return {"message": "File already uploaded to this case", "doc_id": existing.id, "duplicate": True}
     
-    background_tasks.add_task(process_document, file_path, new_doc.id)
+        new_doc = Document(
+            case_id=case_id,
+            filename=file.filename,
+            s3_key=file_path, 
+            content_hash=content_hash
+        )
+        db.add(new_doc)
+        await db.flush()
+
+        # Queued in the same transaction, so a committed document always has a job
+        job = new_job("process_document", {"file_path": file_path, "doc_id": new_doc.id})
+        db.add(job)
+        await db.commit()
+        committed = True
     
-    return {"message": "File uploaded and processing started", "doc_id": new_doc.id}
\ No newline at end of file
+        return {"message": "File uploaded and processing queued", "doc_id": new_doc.id, "job_id": job.id}
+    finally:
+        # The committed row now keeps the file from being reclaimed
+        await run_in_threadpool(release_upload, file_path, hold_path, committed)
+
+@router.post("/{case_id}/documents/bulk")
+async def upload_documents_bulk(
+    case_id: str,
+    files: List[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Uploads many files at once; ZIP archives are expanded. All documents and
+    their processing jobs are created in one transaction under a batch id,
+    whose progress is at GET /api/jobs/batches/{batch_id}; batch_id is null
+    when nothing was queued. Ingestion runs on the bounded job worker pool,
+    not one task per file.
+    """
+    if not await get_active_case(db, case_id):
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    try:
+        stored, skipped = await save_bulk_upload(files)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    committed = False
+    try:
+        result = await db.execute(
+            select(Document)
+            .where(Document.case_id == case_id, Document.content_hash.in_({h for _, _, h, _ in stored}))
+        )
+        existing = {doc.content_hash: doc for doc in result.scalars().all()}
+
+        batch_id = str(uuid.uuid4())
+        new_docs = {}  # content_hash -> Document
+        jobs = {}  # content_hash -> Job, for new documents and failed ones retried
+        entries = []
+        for filename, file_path, content_hash, _ in stored:
+            doc = existing.get(content_hash) or new_docs.get(content_hash)
+            if doc is None:
+                doc = new_docs[content_hash] = Document(
+                    case_id=case_id,
+                    filename=filename,
+                    s3_key=file_path,
+                    content_hash=content_hash
+                )
+                db.add(doc)
+                duplicate = False
+            elif content_hash in existing and content_hash not in jobs and doc.status in RETRYABLE_STATUSES:
+                jobs[content_hash] = _requeue(doc, file_path, batch_id)
+                db.add(jobs[content_hash])
+                duplicate = False
+            else:
+                # Already in the case, or the same bytes twice in this upload
+                duplicate = True
+            entries.append((filename, content_hash, duplicate))
+        await db.flush()
+
+        for content_hash, new_doc in new_docs.items():
+            jobs[content_hash] = new_job(
+                "process_document", {"file_path": new_doc.s3_key, "doc_id": new_doc.id}, batch_id=batch_id
+            )
+            db.add(jobs[content_hash])
+        await db.commit()
+        committed = True
+
+        documents = []
+        for filename, content_hash, duplicate in entries:
+            doc = existing.get(content_hash) or new_docs[content_hash]
+            job_id = None if duplicate else jobs[content_hash].id
+            documents.append({"filename": filename, "doc_id": doc.id, "job_id": job_id, "duplicate": duplicate})
+
+        return {
+            "message": f"{len(jobs)} files uploaded and processing queued",
+            # No batch to poll when every file was a duplicate or skipped
+            "batch_id": batch_id if jobs else None,
+            "documents": documents,
+            "skipped": skipped
+        }
+    finally:
+        # The committed rows now keep the files from being reclaimed
+        for _, file_path, _, hold_path in stored:
+            await run_in_threadpool(release_upload, file_path, hold_path, committed)
\ No newline at end of file
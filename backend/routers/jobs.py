@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_db
+from models.models import Job
+from services.job_queue import job_to_dict
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+@router.get("/batches/{batch_id}")
+async def get_batch(batch_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Aggregate progress of a bulk upload: job counts per status, overall
+    progress (mean of the jobs' progress) and a short entry per job.
+    """
+    result = await db.execute(
+        select(Job.id, Job.payload, Job.status, Job.stage, Job.progress, Job.error)
+        .where(Job.batch_id == batch_id)
+        .order_by(Job.created_at)
+    )
+    rows = result.all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    counts = {"queued": 0, "running": 0, "succeeded": 0, "failed": 0}
+    for row in rows:
+        counts[row.status] = counts.get(row.status, 0) + 1
+    return {
+        "batch_id": batch_id,
+        "total": len(rows),
+        **counts,
+        "progress": round(sum(row.progress or 0 for row in rows) / len(rows)),
+        "done": counts["queued"] + counts["running"] == 0,
+        "jobs": [
+            {
+                "id": row.id,
+                "doc_id": (row.payload or {}).get("doc_id"),
+                "status": row.status,
+                "stage": row.stage,
+                "progress": row.progress,
+                "error": row.error
+            }
+            for row in rows
+        ]
+    }
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job)
@@ -1,27 +1,51 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from core.database import get_db
-from models.models import Case, Document
-from services.llm_service import generate_case_strategy
-import json
+from routers.cases import get_active_case
+from services.job_queue import new_job
+from services.strategy_service import build_strategy, is_strategy_current
 
 router = APIRouter(prefix="/api/cases", tags=["Strategy"])
 
 @router.post("/{case_id}/strategy")
-async def get_case_strategy(case_id: str, db: Session = Depends(get_db)):
-    # 1. Fetch Case
-    case = db.query(Case).filter(Case.id == case_id).first()
+async def get_case_strategy(case_id: str, regenerate: bool = False, db: AsyncSession = Depends(get_db)):
+    # 1. Fetch Case (its digest already summarizes every analyzed document)
+    case = await get_active_case(db, case_id)
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
         
-    # 2. Fetch Documents for this case
-    docs = db.query(Document).filter(Document.case_id == case_id).all()
+    # 2. Reuse the stored strategy unless its inputs changed
+    if not regenerate and is_strategy_current(case):
+        return {"strategy": case.strategy, "cached": True}
     
-    # 3. Prepare data for AI
-    doc_analyses = [d.analysis_json for d in docs if d.analysis_json]
-    case_summary = f"Title: {case.title}. Category: {case.category}. Status: {case.status}"
+    # 3. Generate Strategy (a requested regeneration skips the LLM cache too)
+    strategy_response = await build_strategy(case, refresh=regenerate)
+    await db.commit()
     
-    # 4. Generate Strategy
-    strategy_response = generate_case_strategy(case_summary, doc_analyses)
-    
-    return {"strategy": strategy_response}
\ No newline at end of file
+    return {"strategy": strategy_response, "cached": False}
+
+@router.post("/{case_id}/strategy/regenerate")
+async def regenerate_case_strategy(case_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Queues strategy generation for big cases; poll GET /api/jobs/{job_id}
+    and then fetch GET /api/cases/{case_id}/strategy.
+    """
+    case = await get_active_case(db, case_id)
+    if not case:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    job = new_job("regenerate_strategy", {"case_id": case_id})
+    db.add(job)
+    await db.commit()
+    return {"message": "Strategy regeneration queued", "job_id": job.id}
+
+@router.get("/{case_id}/strategy")
+async def read_case_strategy(case_id: str, db: AsyncSession = Depends(get_db)):
+    case = await get_active_case(db, case_id)
+    if not case:
+        raise HTTPException(status_code=404, detail="Case not found")
+    return {
+        "strategy": case.strategy,
+        "updated_at": case.strategy_updated_at,
+        "stale": not is_strategy_current(case),
+    }
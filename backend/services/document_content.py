@@ -0,0 +1,45 @@
+import json
+import os
+import zlib
+from models.models import DocumentContent
+
+DOCUMENT_COMPRESSION_LEVEL = int(os.getenv("DOCUMENT_COMPRESSION_LEVEL", "6"))
+
+def compress_text(text: str):
+    if text is None:
+        return None
+    return zlib.compress(text.encode("utf-8"), DOCUMENT_COMPRESSION_LEVEL)
+
+def decompress_text(blob: bytes):
+    if blob is None:
+        return None
+    return zlib.decompress(blob).decode("utf-8")
+
+def compress_json(value):
+    if value is None:
+        return None
+    return compress_text(json.dumps(value))
+
+def decompress_json(blob: bytes):
+    if blob is None:
+        return None
+    return json.loads(decompress_text(blob))
+
+def save_document_content(db, doc_id: str, extracted_text: str, analysis: dict):
+    """
+    Stores (or replaces) a document's text and analysis. The caller commits.
+    """
+    db.merge(DocumentContent(
+        document_id=doc_id,
+        extracted_text=compress_text(extracted_text),
+        analysis_json=compress_json(analysis),
+        text_length=len(extracted_text) if extracted_text is not None else None
+    ))
+
+def content_to_dict(content: DocumentContent) -> dict:
+    if content is None:
+        return {"extracted_text": None, "analysis_json": None}
+    return {
+        "extracted_text": decompress_text(content.extracted_text),
+        "analysis_json": decompress_json(content.analysis_json),
+    }
@@ -1,71 +1,530 @@
+import hashlib
 import os
-import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from fastapi import UploadFile
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from fastapi.concurrency import run_in_threadpool
+from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from sqlalchemy import JSON, Text, inspect, text
+from sqlalchemy.exc import IntegrityError
 from services.rag_service import add_documents_to_db
-from core.database import SessionLocal
-from models.models import Document
+from core.database import SessionLocal, engine
+from models.models import Case, Document, DocumentContent
+from services.document_content import save_document_content, decompress_json
 from services.llm_service import analyze_document_text
+from services import llm_cache
+from services import query_cache
+from services.job_queue import JobContext, job_handler
+from services.pdf_extractor import iter_pdf_pages
+from services.lexical_index import add_document_chunks
+from services.strategy_service import summarize_analysis, refresh_case_digest
 
 UPLOAD_DIR = "./uploaded_files"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+UPLOAD_TMP_DIR = os.path.join(UPLOAD_DIR, "tmp")
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
 
-async def save_upload_file(upload_file: UploadFile) -> str:
-    file_path = os.path.join(UPLOAD_DIR, upload_file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(upload_file.file, buffer)
-    return file_path
+def content_path(content_hash: str, extension: str) -> str:
+    return os.path.join(UPLOAD_DIR, content_hash[:2], content_hash + extension)
 
-def process_document(file_path: str, doc_id: str):
+def _link_if_missing(source: str, file_path: str):
+    if os.path.exists(file_path):
+        # Same bytes already stored: keep the existing copy
+        return
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    try:
+        os.link(source, file_path)
+    except FileExistsError:
+        pass
+
+def _commit_upload(tmp_path: str, file_path: str, content_hash: str) -> str:
+    """
+    Publishes the bytes at their content-addressed path and returns a hold:
+    a hard link to the same bytes, kept until the upload's Document row is
+    committed (see release_upload). The reclaimer never deletes content that
+    still has a hold, so it can't remove a file an upload is about to use.
+    """
+    hold_path = os.path.join(UPLOAD_TMP_DIR, f"{content_hash}.{uuid.uuid4().hex}.hold")
+    os.replace(tmp_path, hold_path)
+    _link_if_missing(hold_path, file_path)
+    return hold_path
+
+def has_upload_hold(file_path: str) -> bool:
+    prefix = os.path.splitext(os.path.basename(file_path))[0] + "."
+    return any(
+        name.startswith(prefix) and name.endswith(".hold")
+        for name in os.listdir(UPLOAD_TMP_DIR)
+    )
+
+def release_upload(file_path: str, hold_path: str, keep: bool = True):
+    """
+    Drops an upload's hold once its Document row is committed (keep=True),
+    restoring the file if it was reclaimed in between, or once the upload
+    is abandoned (keep=False).
+    """
+    if not hold_path or not os.path.exists(hold_path):
+        return
+    if keep:
+        _link_if_missing(hold_path, file_path)
+    os.remove(hold_path)
+
+async def save_upload_file(upload_file: UploadFile):
+    """
+    Streams the upload to disk in chunks while hashing it, then stores it
+    under a content-addressed path (uploaded_files/<ab>/<sha256><ext>), so
+    identical uploads share one file. Returns (file_path, content_hash,
+    hold_path); pass the hold to release_upload after committing.
+    """
+    extension = os.path.splitext(upload_file.filename or "")[1].lower()
+    hasher = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_TMP_DIR)
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+
+        content_hash = hasher.hexdigest()
+        file_path = content_path(content_hash, extension)
+        hold_path = await run_in_threadpool(_commit_upload, tmp_path, file_path, content_hash)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return file_path, content_hash, hold_path
+
+def _store_stream(source, extension: str):
+    """
+    Blocking counterpart of save_upload_file for file objects already on
+    the server (e.g. ZIP members). Returns (file_path, content_hash, hold_path).
+    """
+    hasher = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_TMP_DIR)
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                buffer.write(chunk)
+        content_hash = hasher.hexdigest()
+        file_path = content_path(content_hash, extension)
+        hold_path = _commit_upload(tmp_path, file_path, content_hash)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return file_path, content_hash, hold_path
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+BULK_UPLOAD_MAX_FILES = int(os.getenv("BULK_UPLOAD_MAX_FILES", "500"))
+# Uncompressed size limit for a ZIP, checked before anything is extracted
+BULK_UPLOAD_MAX_BYTES = int(os.getenv("BULK_UPLOAD_MAX_BYTES", str(2 * 1024 ** 3)))
+
+def _extract_zip(zip_path: str):
+    """
+    Stores every supported member of a ZIP archive. Returns a list of
+    (filename, file_path, content_hash, hold_path) and the names that were
+    skipped.
+    """
+    stored, skipped = [], []
+    with zipfile.ZipFile(zip_path) as archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if len(members) > BULK_UPLOAD_MAX_FILES:
+            raise ValueError(f"Archive has more than {BULK_UPLOAD_MAX_FILES} files")
+        if sum(info.file_size for info in members) > BULK_UPLOAD_MAX_BYTES:
+            raise ValueError("Archive is too large once extracted")
+        try:
+            for info in members:
+                filename = os.path.basename(info.filename)
+                extension = os.path.splitext(filename)[1].lower()
+                if info.filename.startswith("__MACOSX/") or filename.startswith("."):
+                    continue
+                if extension not in SUPPORTED_EXTENSIONS:
+                    skipped.append(info.filename)
+                    continue
+                with archive.open(info) as member:
+                    stored.append((filename, *_store_stream(member, extension)))
+        except Exception:
+            for _, file_path, _, hold_path in stored:
+                release_upload(file_path, hold_path, keep=False)
+            raise
+    return stored, skipped
+
+async def save_bulk_upload(upload_files: list):
+    """
+    Stores every file of a bulk upload; ZIP archives are expanded. Returns
+    a list of (filename, file_path, content_hash, hold_path) and the skipped
+    filenames. On error, the holds of what was already stored are released.
+    """
+    stored, skipped = [], []
+    try:
+        for upload_file in upload_files:
+            filename = upload_file.filename or ""
+            extension = os.path.splitext(filename)[1].lower()
+            if extension == ".zip":
+                zip_path, _, zip_hold = await save_upload_file(upload_file)
+                try:
+                    members, members_skipped = await run_in_threadpool(_extract_zip, zip_path)
+                finally:
+                    # Only the extracted members are referenced by documents
+                    release_upload(zip_path, zip_hold, keep=False)
+                    os.remove(zip_path)
+                stored.extend(members)
+                skipped.extend(members_skipped)
+            elif extension in SUPPORTED_EXTENSIONS:
+                stored.append((filename, *await save_upload_file(upload_file)))
+            else:
+                skipped.append(filename)
+            if len(stored) > BULK_UPLOAD_MAX_FILES:
+                raise ValueError(f"More than {BULK_UPLOAD_MAX_FILES} files in one upload")
+    except Exception:
+        for _, file_path, _, hold_path in stored:
+            release_upload(file_path, hold_path, keep=False)
+        raise
+    return stored, skipped
+
+def _find_previous_analysis(db, doc_record):
+    """
+    Analysis of an earlier upload with the same bytes, if one finished
+    successfully, so the LLM call can be skipped.
+    """
+    if doc_record is None or not doc_record.content_hash:
+        return None
+    previous = db.query(DocumentContent.analysis_json)\
+        .join(Document, Document.id == DocumentContent.document_id)\
+        .filter(
+            Document.content_hash == doc_record.content_hash,
+            Document.id != doc_record.id,
+            Document.status == "processed"
+        )\
+        .all()
+    for (blob,) in previous:
+        analysis = decompress_json(blob)
+        if analysis and "error" not in analysis:
+            return analysis
+    return None
+
+INGEST_INDEX_BATCH = int(os.getenv("INGEST_INDEX_BATCH", "64"))
+
+class StageTimings:
+    """
+    Busy time per ingestion stage. Stages overlap, so `total` (wall clock)
+    ends up close to the slowest stage rather than the sum of all of them.
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.seconds[stage] += time.perf_counter() - start
+
+    def as_dict(self) -> dict:
+        timings = {stage: round(seconds, 3) for stage, seconds in self.seconds.items()}
+        timings["total"] = round(time.perf_counter() - self._start, 3)
+        return timings
+
+def _iter_pages(file_path: str):
+    if file_path.endswith(".pdf"):
+        return iter_pdf_pages(file_path)
+    elif file_path.endswith(".txt"):
+        return TextLoader(file_path, encoding='utf-8').lazy_load()
+    return iter(())
+
+def _save_results(db, doc_record, full_text: str, analysis_result: dict):
+    save_document_content(db, doc_record.id, full_text, analysis_result)
+    if "error" in analysis_result:
+        # Indexed and searchable in chat, but without an analysis
+        doc_record.status = "partial"
+    else:
+        doc_record.status = "processed"
+        doc_record.summary_json = summarize_analysis(doc_record.filename, analysis_result)
+    db.commit()
+    refresh_case_digest(db, doc_record.case_id)
+
+class IngestCancelled(Exception):
+    pass
+
+class AnalysisFailed(Exception):
+    pass
+
+def _ensure_case_active(doc_id: str) -> str:
+    """
+    Case id of the document, or IngestCancelled if the document or its case
+    was deleted. Uses its own session so it sees the latest commits.
+    """
+    db = SessionLocal()
+    try:
+        row = db.query(Document.case_id, Case.deleted_at)\
+            .join(Case, Case.id == Document.case_id)\
+            .filter(Document.id == doc_id)\
+            .first()
+    finally:
+        db.close()
+    if row is None or row.deleted_at is not None:
+        raise IngestCancelled(f"Document {doc_id} or its case was deleted")
+    return row.case_id
+
+def process_document(file_path: str, doc_id: str, ctx: JobContext = None):
+    """
+    Pipelined ingestion: pages are parsed lazily and split as they arrive,
+    chunks are indexed in batches on a background thread while parsing
+    continues, and the LLM analysis runs while the last batches are indexed.
+
+    Returns the stage timings, or None if the document couldn't be processed.
+    Raises IngestCancelled if the document or its case is deleted meanwhile,
+    and AnalysisFailed if the document was saved as "partial" because its
+    analysis still failed after the stage's retries.
+    """
     print(f"Processing file: {file_path}")
-    docs = []
+    ctx = ctx or JobContext()
+    timings = StageTimings()
     
     db = SessionLocal()
+    indexer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-index")
     try:
-        # 1. Load File
-        if file_path.endswith(".pdf"):
-            loader = PyPDFLoader(file_path)
-            docs.extend(loader.load())
-        elif file_path.endswith(".txt"):
-            loader = TextLoader(file_path, encoding='utf-8')
-            docs.extend(loader.load())
-            
-        if not docs:
-            print("❌ Error: No text found in document.")
-            return False
-
-        full_text = "\n".join([d.page_content for d in docs])
-        
-        # 2. Get Case ID (CRITICAL FOR RAG)
+        # Case ID (CRITICAL FOR RAG); nothing to do for a deleted case
+        current_case_id = _ensure_case_active(doc_id)
         doc_record = db.query(Document).filter(Document.id == doc_id).first()
-        current_case_id = doc_record.case_id if doc_record else "unknown"
 
-        # 3. Split & Embed with Metadata
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = text_splitter.split_documents(docs)
-        
-        # --- FIX: Add metadata to every chunk ---
-        for split in splits:
-            split.metadata["case_id"] = current_case_id
-            split.metadata["doc_id"] = doc_id
-        
-        add_documents_to_db(splits)
-        
-        # 4. Analyze & Save
-        print("Running Legal Analysis...")
-        analysis_result = analyze_document_text(full_text)
+
+        def index_batch(batch):
+            with timings.measure("embed"):
+                ctx.stage("embed", None, add_documents_to_db, batch)
+
+        def index_lexical(case_id, doc_id, chunks):
+            with timings.measure("lexical"):
+                ctx.stage("lexical", None, add_document_chunks, case_id, doc_id, chunks)
+
+        # 1. Parse -> split -> embed, page by page
+        page_texts = []
+        lexical_chunks = []
+        buffer = []
+        index_futures = []
+
+        def flush(batch):
+            index_futures.append(indexer.submit(index_batch, batch))
+            # The lexical segment keeps each chunk's text and metadata by
+            # reference; they are not copied per chunk
+            lexical_chunks.extend(
+                {"chunk_id": split.metadata["chunk_id"], "text": split.page_content, "metadata": split.metadata}
+                for split in batch
+            )
+
+        pages = _iter_pages(file_path)
+        while True:
+            with timings.measure("parse"):
+                page = next(pages, None)
+            if page is None:
+                break
+            page_texts.append(page.page_content)
+
+            with timings.measure("split"):
+                splits = text_splitter.split_documents([page])
+            # --- FIX: Add metadata to every chunk ---
+            for split in splits:
+                split.metadata["case_id"] = current_case_id
+                split.metadata["doc_id"] = doc_id
+                split.metadata["chunk_id"] = f"{doc_id}:{len(lexical_chunks) + len(buffer)}"
+                buffer.append(split)
+
+            if len(buffer) >= INGEST_INDEX_BATCH:
+                flush(buffer)
+                buffer = []
+
+        if not page_texts:
+            print("❌ Error: No text found in document.")
+            _mark_failed(db, doc_id)
+            return None
+
+        if buffer:
+            flush(buffer)
+            buffer = []
+        index_futures.append(indexer.submit(
+            index_lexical, current_case_id, doc_id, lexical_chunks
+        ))
+        ctx.report("parse", 40)
+
+        full_text = "\n".join(page_texts)
+        del page_texts
+
+        # 2. Analyze while the indexer drains
+        _ensure_case_active(doc_id)
+        analysis_error = None
+        with timings.measure("analyze"):
+            analysis_result = _find_previous_analysis(db, doc_record)
+            if analysis_result is not None:
+                print("Reusing analysis of an identical earlier upload.")
+                ctx.report("analyze", 80)
+            else:
+                print("Running Legal Analysis...")
+                try:
+                    analysis_result = ctx.stage("analyze", 80, analyze_document_text, full_text,
+                                                 [chunk["text"] for chunk in lexical_chunks])
+                except Exception as e:
+                    # Retries are used up; keep the text and index, report the failure
+                    print(f"❌ Analysis of {doc_id} failed: {e}")
+                    analysis_error = str(e)
+                    analysis_result = {"error": "Failed to analyze document"}
+
+        for future in index_futures:
+            future.result()
         
+        # 3. Save
+        _ensure_case_active(doc_id)
         if doc_record:
-            doc_record.extracted_text = full_text
-            doc_record.analysis_json = analysis_result
-            db.commit()
+            ctx.stage("save", 100, _save_results, db, doc_record, full_text, analysis_result)
+            # Strategy and other case-level responses are now out of date
+            llm_cache.invalidate_case(current_case_id)
+            query_cache.invalidate_case(current_case_id)
             print(f"✅ Document {doc_id} processed & saved.")
-            
-        return True
 
+        result = timings.as_dict()
+        print(f"⏱️ Ingestion timings for {doc_id}: {result}")
+        if analysis_error is not None:
+            raise AnalysisFailed(f"Document {doc_id} was indexed but its analysis failed: {analysis_error}")
+        return result
+
+    except IngestCancelled:
+        print(f"⚠️ Stopped processing {doc_id}: it or its case was deleted.")
+        raise
+    except AnalysisFailed:
+        raise
     except Exception as e:
         print(f"❌ Error processing document: {e}")
-        return False
+        db.rollback()
+        _mark_failed(db, doc_id)
+        return None
+    finally:
+        indexer.shutdown(wait=True, cancel_futures=True)
+        db.close()
+
+def _mark_failed(db, doc_id: str):
+    # Don't leave the document showing as processing forever
+    updated = db.query(Document).filter(Document.id == doc_id).update({"status": "failed"}, synchronize_session=False)
+    if updated:
+        # No content row for a document that was reclaimed meanwhile
+        save_document_content(db, doc_id, None, {"error": "Failed to process document"})
+    db.commit()
+
+LEGACY_BACKFILL_BATCH = int(os.getenv("LEGACY_BACKFILL_BATCH", "200"))
+LEGACY_DOCUMENT_COLUMNS = ("extracted_text", "analysis_json")
+# What older versions stored on upload, before processing filled in the row
+LEGACY_PLACEHOLDER_TEXT = "Processing..."
+
+def _legacy_status(extracted_text, analysis) -> str:
+    if not extracted_text or extracted_text == LEGACY_PLACEHOLDER_TEXT:
+        # Never finished processing (or found no text)
+        return "failed"
+    if not isinstance(analysis, dict) or not analysis:
+        return "failed"
+    return "partial" if "error" in analysis else "processed"
+
+def backfill_legacy_document_content():
+    """
+    One-off move of the text and analysis that older databases kept on the
+    documents row into compressed document_contents rows, one batch per
+    transaction. Also fills in the status (processed, partial with an
+    analysis error, failed when processing never finished), summary and
+    case digest those documents never had, then drops the old columns.
+    Does nothing once the columns are gone.
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("documents")}
+    if not all(name in columns for name in LEGACY_DOCUMENT_COLUMNS):
+        return 0
+
+    # Documents uploaded since the upgrade leave the old columns empty
+    legacy_rows = text(
+        "SELECT d.id, d.extracted_text, d.analysis_json FROM documents d "
+        "LEFT JOIN document_contents c ON c.document_id = d.id "
+        "WHERE c.document_id IS NULL "
+        "AND (d.extracted_text IS NOT NULL OR d.analysis_json IS NOT NULL) LIMIT :limit"
+    ).columns(extracted_text=Text, analysis_json=JSON)
+
+    moved = 0
+    case_ids = set()
+    db = SessionLocal()
+    try:
+        while True:
+            rows = db.execute(legacy_rows, {"limit": LEGACY_BACKFILL_BATCH}).all()
+            if not rows:
+                break
+            for doc_id, extracted_text, analysis in rows:
+                status = _legacy_status(extracted_text, analysis)
+                if extracted_text == LEGACY_PLACEHOLDER_TEXT:
+                    extracted_text = None
+                save_document_content(db, doc_id, extracted_text, analysis or None)
+                doc_record = db.get(Document, doc_id)
+                if doc_record.status is None:
+                    doc_record.status = status
+                if status == "processed" and doc_record.summary_json is None:
+                    doc_record.summary_json = summarize_analysis(doc_record.filename, analysis)
+                case_ids.add(doc_record.case_id)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another API process moved some of this batch first
+                db.rollback()
+                continue
+            moved += len(rows)
+
+        for case_id in case_ids:
+            refresh_case_digest(db, case_id)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+    # Everything is in document_contents now; the old columns are dead weight
+    try:
+        with engine.begin() as conn:
+            for name in LEGACY_DOCUMENT_COLUMNS:
+                conn.execute(text(f"ALTER TABLE documents DROP COLUMN {name}"))
+    except Exception as e:
+        # e.g. SQLite older than 3.35, or another process dropped them first
+        print(f"⚠️ Could not drop legacy document columns: {e}")
+
+    print(f"✅ Moved {moved} legacy documents into document_contents.")
+    return moved
+
+def _run_legacy_backfill():
+    try:
+        backfill_legacy_document_content()
+    except Exception as e:
+        # Retried on the next start; untouched rows keep their old columns
+        print(f"⚠️ Legacy document backfill failed: {e}")
+
+def start_legacy_backfill():
+    """
+    Runs the backfill on a background thread so a large legacy database
+    doesn't hold up startup. Documents not moved yet just show without
+    their text or analysis until their batch is done.
+    """
+    thread = threading.Thread(target=_run_legacy_backfill, name="legacy-backfill", daemon=True)
+    thread.start()
+    return thread
+
+@job_handler("process_document")
+def process_document_job(ctx: JobContext):
+    timings = process_document(ctx.payload["file_path"], ctx.payload["doc_id"], ctx)
+    if timings is None:
+        raise RuntimeError(f"Could not process document {ctx.payload['doc_id']}")
+    return {"doc_id": ctx.payload["doc_id"], "timings": timings}
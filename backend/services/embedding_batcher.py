@@ -0,0 +1,100 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from langchain_core.embeddings import Embeddings
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "10"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+
+class _EmbedRequest:
+    __slots__ = ("texts", "future")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.future = Future()
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model with a shared request queue. Chunks from uploads
+    and queries from chats are gathered into batches of at most
+    `max_batch_size` texts, waiting no longer than `max_wait_ms` for a batch to
+    fill, and embedded with one `embed_documents` call per batch.
+
+    Queries go through `embed_documents` as well, which is equivalent for
+    symmetric models like MiniLM.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = EMBED_BATCH_SIZE,
+                 max_wait_ms: float = EMBED_MAX_WAIT_MS, workers: int = EMBED_WORKERS):
+        self.embeddings = embeddings
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"embed-batcher-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _submit(self, texts) -> Future:
+        request = _EmbedRequest(texts)
+        self._queue.put(request)
+        return request.future
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        # Oversized inputs are split so a single big upload can't starve chat
+        # queries waiting behind it
+        futures = [
+            self._submit(texts[i:i + self.max_batch_size])
+            for i in range(0, len(texts), self.max_batch_size)
+        ]
+        vectors = []
+        for future in futures:
+            vectors.extend(future.result())
+        return vectors
+
+    def embed_query(self, text):
+        return self._submit([text]).result()[0]
+
+    def _collect_batch(self, first):
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if size + len(request.texts) > self.max_batch_size:
+                # Doesn't fit: it starts the next batch instead of overshooting
+                return batch, request
+            batch.append(request)
+            size += len(request.texts)
+        return batch, None
+
+    def _worker(self):
+        carry = None
+        while True:
+            first = carry if carry is not None else self._queue.get()
+            batch, carry = self._collect_batch(first)
+            texts = [text for request in batch for text in request.texts]
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in batch:
+                request.future.set_result(vectors[offset:offset + len(request.texts)])
+                offset += len(request.texts)
@@ -0,0 +1,77 @@
+import hashlib
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+from core.disk_cache import DiskCache
+
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./embedding_cache/embeddings.db")
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+# Chat questions are kept in memory only, in a small LRU of their own, so
+# one-off questions never evict document chunks from the disk cache
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "256"))
+
+def _to_bytes(vector) -> bytes:
+    return array("f", vector).tobytes()
+
+def _from_bytes(blob: bytes) -> list:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed cache in front of an Embeddings model. Vectors are stored
+    as float32 on disk, keyed by sha256(model name + chunk text), so the same
+    NDA or statute uploaded again is never re-embedded.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: DiskCache = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache or DiskCache(EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES)
+        # question -> vector, most recently used last
+        self._queries = OrderedDict()
+        self._queries_lock = threading.Lock()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        keys = [self._key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # Embed each unseen text once, even if it repeats within the upload
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = {key: _to_bytes(vector) for key, vector in zip(missing, vectors)}
+            self.cache.set_many(fresh)
+            cached.update(fresh)
+
+        return [_from_bytes(cached[key]) for key in keys]
+
+    def embed_query(self, text):
+        """
+        The query cache and the retriever both embed the same question, so a
+        small in-memory LRU saves the second call without persisting it.
+        """
+        with self._queries_lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+                return vector
+
+        vector = self.embeddings.embed_query(text)
+        with self._queries_lock:
+            self._queries[text] = vector
+            while len(self._queries) > QUERY_EMBED_CACHE_SIZE:
+                self._queries.popitem(last=False)
+        return vector
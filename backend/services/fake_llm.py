@@ -0,0 +1,79 @@
+import asyncio
+import json
+import os
+import time
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+RISK_ORDER = ["Low", "Medium", "High"]
+
+SECTION_ANALYSIS = {
+    "parties": ["Fake Party A", "Fake Party B"],
+    "agreement_type": "Service Agreement",
+    "termination_clause": "Either party may terminate with 30 days' written notice.",
+    "payment_terms": "Invoices payable within 30 days.",
+    "liability_indemnity": "Liability capped at fees paid in the preceding 12 months.",
+    "risk_rating": "Medium",
+    "key_risks": ["Uncapped indemnity for IP claims"],
+}
+
+STRATEGY = {
+    "summary": "Strategy from the local fake LLM.",
+    "safe_plan": ["Send a notice under the termination clause"],
+    "aggressive_plan": ["File for interim relief"],
+    "missing_documents": ["Signed copy of the agreement"],
+}
+
+def _merge(analyses: list) -> dict:
+    """
+    Unions the list fields and keeps the highest risk, like the merge prompt asks.
+    """
+    merged = dict(analyses[0])
+    for key in ("parties", "key_risks"):
+        merged[key] = list(dict.fromkeys(item for analysis in analyses for item in analysis.get(key, [])))
+    merged["risk_rating"] = max((analysis.get("risk_rating", "Low") for analysis in analyses), key=RISK_ORDER.index)
+    return merged
+
+def fake_reply(messages) -> str:
+    """
+    JSON for the analysis, merge and strategy prompts, FAKE_LLM_RESPONSE for
+    everything else (chat, summaries).
+    """
+    system = next((m.content for m in messages if m.type == "system"), "")
+    human = next((m.content for m in reversed(messages) if m.type == "human"), "")
+    if "STRICT JSON" in system:
+        if human.startswith("Section Analyses:"):
+            return json.dumps(_merge(json.loads(human.split("\n", 1)[1])))
+        return json.dumps(SECTION_ANALYSIS)
+    if "strategic plan in JSON" in system:
+        return json.dumps(STRATEGY)
+    return os.getenv("FAKE_LLM_RESPONSE", "This is a response from the local fake LLM.")
+
+class FakeLegalChatModel(FakeListChatModel):
+    """
+    Local stand-in for GPT-4o: answers each prompt the way the code reading
+    it expects, streaming one character per `sleep`.
+    """
+    responses: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-legal-chat-model"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        if self.sleep is not None:
+            time.sleep(self.sleep)
+        return fake_reply(messages)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for char in fake_reply(messages):
+            if self.sleep is not None:
+                time.sleep(self.sleep)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=char))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for char in fake_reply(messages):
+            if self.sleep is not None:
+                await asyncio.sleep(self.sleep)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=char))
\ No newline at end of file
@@ -0,0 +1,253 @@
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_
+from core.database import SessionLocal
+from models.models import Job
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# "thread" runs workers inside the API process. "process" gives each worker its
+# own process, which needs a vector store that tolerates writers in other
+# processes (Chroma's persistent client does not).
+JOB_WORKER_MODE = os.getenv("JOB_WORKER_MODE", "thread")
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "900"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_STAGE_RETRIES = int(os.getenv("JOB_STAGE_RETRIES", "3"))
+# How often a running job renews its lease, so a long stage isn't mistaken
+# for a crashed worker
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", str(JOB_LEASE_SECONDS / 3)))
+
+# Modules that register handlers with @job_handler; imported by every worker
+HANDLER_MODULES = ["services.document_service", "services.strategy_service", "services.reclaim_service"]
+
+JOB_HANDLERS = {}
+
+_stop_event = None
+_workers = []
+
+def job_handler(kind: str):
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+def new_job(kind: str, payload: dict, batch_id: str = None) -> Job:
+    """
+    Builds a queued Job. The caller adds it to its own session so the job is
+    committed in the same transaction as the rows it refers to.
+    """
+    return Job(kind=kind, payload=payload, batch_id=batch_id, status="queued", max_attempts=JOB_MAX_ATTEMPTS)
+
+def job_to_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "batch_id": job.batch_id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "attempts": job.attempts,
+        "error": job.error,
+        "result": job.result,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+class JobContext:
+    """
+    Handed to job handlers. `stage()` runs one step with retries and records
+    stage name and progress (if given) on the job row; without a job_id it
+    just calls the step, so handlers also work when called directly.
+    """
+
+    def __init__(self, job_id: str = None, payload: dict = None):
+        self.job_id = job_id
+        self.payload = payload or {}
+
+    def _update(self, **values):
+        if self.job_id is None:
+            return
+        values["locked_until"] = datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+        values["updated_at"] = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(Job.id == self.job_id).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def report(self, stage: str, progress: int):
+        self._update(stage=stage, progress=progress)
+
+    def stage(self, name: str, progress: int, fn, *args, **kwargs):
+        self._update(stage=name)
+        for attempt in range(1, JOB_STAGE_RETRIES + 1):
+            try:
+                result = fn(*args, **kwargs)
+                break
+            except Exception as e:
+                if self.job_id is None or attempt == JOB_STAGE_RETRIES:
+                    raise
+                print(f"⚠️ Job {self.job_id} stage '{name}' failed (attempt {attempt}): {e}")
+                time.sleep(min(2 ** attempt, 30))
+        if progress is not None:
+            self._update(progress=progress)
+        return result
+
+def _claimable():
+    return or_(
+        Job.status == "queued",
+        # A worker that crashed mid-job leaves it "running" with a stale lease
+        and_(Job.status == "running", Job.locked_until < datetime.utcnow())
+    )
+
+def claim_next_job(db):
+    candidates = db.query(Job.id).filter(_claimable()).order_by(Job.created_at).limit(5).all()
+    for (job_id,) in candidates:
+        now = datetime.utcnow()
+        claimed = db.query(Job).filter(Job.id == job_id, _claimable()).update({
+            "status": "running",
+            "attempts": Job.attempts + 1,
+            "locked_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            "updated_at": now,
+        }, synchronize_session=False)
+        db.commit()
+        # Another worker may have won the race for this row
+        if claimed:
+            return db.get(Job, job_id)
+    return None
+
+def cancel_jobs(db, job_ids, error: str) -> int:
+    """
+    Fails jobs that no worker holds (queued, or running on an expired lease)
+    so they are never picked up. Jobs that are running stay untouched.
+    """
+    if not job_ids:
+        return 0
+    cancelled = db.query(Job).filter(Job.id.in_(job_ids), _claimable()).update({
+        "status": "failed",
+        "error": error,
+        "locked_until": None,
+        "updated_at": datetime.utcnow(),
+    }, synchronize_session=False)
+    db.commit()
+    return cancelled
+
+def _finish(job_id: str, **values):
+    values["locked_until"] = None
+    values["updated_at"] = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job_id).update(values, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def _renew_lease(job_id: str):
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job_id, Job.status == "running").update({
+            "locked_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            "updated_at": now,
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def _heartbeat(job_id: str, done):
+    while not done.wait(JOB_HEARTBEAT_SECONDS):
+        try:
+            _renew_lease(job_id)
+        except Exception as e:
+            print(f"⚠️ Could not renew lease of job {job_id}: {e}")
+
+@contextmanager
+def _holding_lease(job_id: str):
+    """
+    Renews the job's lease in the background for as long as the handler runs.
+    """
+    done = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job_id, done), name=f"job-heartbeat-{job_id}", daemon=True)
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        done.set()
+        heartbeat.join()
+
+def run_job(job: Job):
+    if job.attempts > job.max_attempts:
+        _finish(job.id, status="failed", error="Gave up after repeated worker crashes")
+        return
+
+    handler = JOB_HANDLERS.get(job.kind)
+    if handler is None:
+        _finish(job.id, status="failed", error=f"No handler for job kind '{job.kind}'")
+        return
+
+    print(f"Running job {job.id} ({job.kind}), attempt {job.attempts}")
+    try:
+        with _holding_lease(job.id):
+            result = handler(JobContext(job.id, job.payload))
+        _finish(job.id, status="succeeded", progress=100, result=result)
+        print(f"✅ Job {job.id} done.")
+    except Exception as e:
+        traceback.print_exc()
+        _finish(job.id, status="failed", error=str(e))
+        print(f"❌ Job {job.id} failed: {e}")
+
+def _load_handlers():
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+def worker_loop(stop_event, name: str = "job-worker"):
+    _load_handlers()
+    print(f"{name} started.")
+    while not stop_event.is_set():
+        db = SessionLocal()
+        try:
+            job = claim_next_job(db)
+        except Exception as e:
+            print(f"⚠️ {name} could not claim a job: {e}")
+            job = None
+        finally:
+            db.close()
+
+        if job is None:
+            stop_event.wait(JOB_POLL_SECONDS)
+            continue
+        run_job(job)
+
+def start_workers(count: int = JOB_WORKERS, mode: str = JOB_WORKER_MODE):
+    global _stop_event
+    if count <= 0 or _workers:
+        return
+    if mode == "process":
+        mp = multiprocessing.get_context("spawn")
+        _stop_event = mp.Event()
+        make_worker = mp.Process
+    else:
+        _stop_event = threading.Event()
+        make_worker = threading.Thread
+
+    for i in range(count):
+        name = f"job-worker-{i}"
+        worker = make_worker(target=worker_loop, args=(_stop_event, name), name=name, daemon=True)
+        worker.start()
+        _workers.append(worker)
+
+def stop_workers(timeout: float = 10):
+    if _stop_event is None:
+        return
+    _stop_event.set()
+    for worker in _workers:
+        worker.join(timeout)
+    _workers.clear()
+
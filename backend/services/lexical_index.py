@@ -0,0 +1,244 @@
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from collections import Counter, OrderedDict
+import numpy as np
+from langchain_core.documents import Document
+
+LEXICAL_INDEX_DIR = "./lexical_index"
+LEXICAL_CACHE_SIZE = int(os.getenv("LEXICAL_CACHE_SIZE", "32"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Keeps section numbers and hyphenated terms together: "12.3", "non-compete"
+_TOKEN_RE = re.compile(r"\w+(?:[.\-/]\w+)*")
+
+def tokenize(text: str) -> list:
+    return _TOKEN_RE.findall(text.lower())
+
+def term_id(term: str) -> int:
+    """
+    Stable 64-bit id of a term. Segments store these instead of the terms,
+    so a posting costs 8 bytes however long the token (URLs, glued text).
+    """
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+def _case_dir(case_id: str) -> str:
+    return os.path.join(LEXICAL_INDEX_DIR, case_id)
+
+def add_document_chunks(case_id: str, doc_id: str, chunks: list):
+    """
+    Writes one immutable index segment for a document's chunks. `chunks` is
+    a list of dicts with chunk_id, text and metadata.
+
+    Segment layout: the document's postings as parallel arrays (term id,
+    chunk position, term frequency) plus chunk lengths; texts and metadata
+    go to a JSON file next to it.
+    """
+    term_ids, positions, freqs, lengths = [], [], [], []
+    ids = {}
+    for position, chunk in enumerate(chunks):
+        tokens = tokenize(chunk["text"])
+        lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            if term not in ids:
+                ids[term] = term_id(term)
+            term_ids.append(ids[term])
+            positions.append(position)
+            freqs.append(tf)
+
+    directory = _case_dir(case_id)
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, doc_id)
+    with open(base + ".json.tmp", "w", encoding="utf-8") as f:
+        json.dump(chunks, f)
+    with open(base + ".npz.tmp", "wb") as f:
+        np.savez(
+            f,
+            term_ids=np.array(term_ids, dtype=np.int64),
+            positions=np.array(positions, dtype=np.int32),
+            freqs=np.array(freqs, dtype=np.float32),
+            lengths=np.array(lengths, dtype=np.int32)
+        )
+    # The .npz appearing is what makes the segment visible to readers (which
+    # notice it by its file signature and add it to their cached index)
+    os.replace(base + ".json.tmp", base + ".json")
+    os.replace(base + ".npz.tmp", base + ".npz")
+
+def delete_case_index(case_id: str):
+    shutil.rmtree(_case_dir(case_id), ignore_errors=True)
+    _invalidate(case_id)
+
+class _Run:
+    """
+    Postings of one or more segments as a CSR-style inverted index sorted by
+    term id: `offsets[i]:offsets[i + 1]` slices `postings`/`freqs` for `terms[i]`.
+    """
+
+    def __init__(self, term_ids, chunks, freqs):
+        order = np.argsort(term_ids, kind="stable")
+        term_ids = term_ids[order]
+        self.postings = chunks[order]
+        self.freqs = freqs[order]
+        self.terms, starts = np.unique(term_ids, return_index=True)
+        self.offsets = np.append(starts, len(term_ids))
+
+    def __len__(self):
+        return len(self.postings)
+
+    def term_ids(self):
+        return np.repeat(self.terms, np.diff(self.offsets))
+
+    def lookup(self, term_ids):
+        """
+        Posting slice per requested term id, None where the term is absent.
+        """
+        found = np.searchsorted(self.terms, term_ids)
+        slices = []
+        for term, i in zip(term_ids, found):
+            if i < len(self.terms) and self.terms[i] == term:
+                slices.append(slice(int(self.offsets[i]), int(self.offsets[i + 1])))
+            else:
+                slices.append(None)
+        return slices
+
+    @staticmethod
+    def merge(a, b):
+        return _Run(
+            np.concatenate([a.term_ids(), b.term_ids()]),
+            np.concatenate([a.postings, b.postings]),
+            np.concatenate([a.freqs, b.freqs])
+        )
+
+def _load_segment(path: str):
+    with np.load(path) as segment:
+        if "term_ids" in segment:
+            term_ids = segment["term_ids"]
+        else:
+            # Segments written before term ids were introduced
+            term_ids = np.array([term_id(term) for term in segment["terms"].tolist()], dtype=np.int64)
+        positions = segment["positions"]
+        freqs = segment["freqs"]
+        lengths = segment["lengths"]
+    with open(path[:-len(".npz")] + ".json", encoding="utf-8") as f:
+        chunks = json.load(f)
+    return term_ids, positions, freqs, lengths, chunks
+
+class CaseIndex:
+    """
+    All segments of a case, searchable together. Segments are added as they
+    appear and kept in a few runs whose sizes shrink geometrically: a new
+    run is merged into the previous one while that one is no bigger, so each
+    posting is re-merged O(log n) times instead of on every added document.
+    """
+
+    def __init__(self):
+        self.runs = []
+        self.chunks = []
+        self.lengths = np.zeros(0, np.float32)
+        self.segments = set()  # (path, mtime) of the segments already added
+        self._lock = threading.Lock()
+
+    def add_segments(self, segments: list):
+        with self._lock:
+            for segment in segments:
+                if segment in self.segments:
+                    continue
+                term_ids, positions, freqs, lengths, chunks = _load_segment(segment[0])
+                run = _Run(term_ids, positions.astype(np.int32) + len(self.chunks), freqs)
+                self.chunks.extend(chunks)
+                self.lengths = np.concatenate([self.lengths, lengths.astype(np.float32)])
+                self.segments.add(segment)
+                self.runs.append(run)
+                while len(self.runs) > 1 and len(self.runs[-2]) <= len(self.runs[-1]):
+                    last = self.runs.pop()
+                    self.runs[-1] = _Run.merge(self.runs[-1], last)
+
+    def refresh(self, segments: list) -> bool:
+        """
+        Adds segments not seen yet. False if a segment this index holds was
+        removed or rewritten, in which case it has to be rebuilt.
+        """
+        with self._lock:
+            if not self.segments <= set(segments):
+                return False
+        self.add_segments(segments)
+        return True
+
+    def search(self, query: str, k: int):
+        with self._lock:
+            n_chunks = len(self.chunks)
+            if not n_chunks:
+                return []
+            scores = np.zeros(n_chunks, dtype=np.float32)
+            avg_length = float(self.lengths.mean())
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths / max(avg_length, 1e-6))
+            query_ids = np.array(sorted({term_id(term) for term in tokenize(query)}), dtype=np.int64)
+            per_run = [run.lookup(query_ids) for run in self.runs]
+            for t in range(len(query_ids)):
+                hits = [(run, slices[t]) for run, slices in zip(self.runs, per_run) if slices[t] is not None]
+                df = sum(s.stop - s.start for _, s in hits)
+                if not df:
+                    continue
+                idf = math.log(1 + (n_chunks - df + 0.5) / (df + 0.5))
+                for run, s in hits:
+                    chunk_ids = run.postings[s]
+                    tf = run.freqs[s]
+                    scores[chunk_ids] += idf * tf * (BM25_K1 + 1) / (tf + norm[chunk_ids])
+
+            k = min(k, n_chunks)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.chunks[i], float(scores[i])) for i in top if scores[i] > 0]
+
+# case_id -> CaseIndex, most recently used last
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _invalidate(case_id: str):
+    with _cache_lock:
+        _cache.pop(case_id, None)
+
+def _segments(case_id: str):
+    directory = _case_dir(case_id)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        (entry.path, entry.stat().st_mtime_ns)
+        for entry in os.scandir(directory) if entry.name.endswith(".npz")
+    )
+
+def _get_case_index(case_id: str):
+    # Segments may be written by other workers, so the cached index is checked
+    # against the current segment files: new ones are added to it, and it is
+    # only rebuilt if a segment it holds was removed or rewritten
+    signature = _segments(case_id)
+    with _cache_lock:
+        cached = _cache.get(case_id)
+        if cached is not None:
+            _cache.move_to_end(case_id)
+
+    if cached is not None and cached.refresh(signature):
+        return cached
+
+    index = CaseIndex()
+    index.add_segments(signature)
+    with _cache_lock:
+        _cache[case_id] = index
+        while len(_cache) > LEXICAL_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+def search(case_id: str, query: str, k: int = 20) -> list:
+    """
+    BM25 over the case's chunks. Returns Documents, best first.
+    """
+    results = _get_case_index(case_id).search(query, k)
+    return [
+        Document(page_content=chunk["text"], metadata=chunk["metadata"])
+        for chunk, _ in results
+    ]
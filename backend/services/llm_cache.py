@@ -0,0 +1,46 @@
+import hashlib
+import os
+import threading
+from core.disk_cache import DiskCache
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./llm_cache/responses.db")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache() -> DiskCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskCache(LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS)
+    return _cache
+
+def prompt_key(model_name: str, messages) -> str:
+    """
+    Hash of the model and every message (role + content) sent to it.
+    """
+    hasher = hashlib.sha256(model_name.encode("utf-8"))
+    for message in messages:
+        hasher.update(b"\0" + message.type.encode("utf-8") + b"\0")
+        hasher.update(message.content.encode("utf-8"))
+    return hasher.hexdigest()
+
+def lookup(key: str):
+    cached = get_llm_cache().get(key)
+    return cached.decode("utf-8") if cached is not None else None
+
+def store(key: str, content: str, case_id: str = None):
+    get_llm_cache().set(key, content.encode("utf-8"), tag=f"case:{case_id}" if case_id else None)
+
+def invalidate_case(case_id: str) -> int:
+    """
+    Drops cached responses built from a case's documents. Called whenever a
+    document is added to or removed from the case.
+    """
+    return get_llm_cache().invalidate_tag(f"case:{case_id}")
+
+def get_llm_cache_stats():
+    return get_llm_cache().stats()
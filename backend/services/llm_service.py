@@ -1,17 +1,40 @@
 from langchain_openai import ChatOpenAI
-from langchain_classic.chains import RetrievalQA
 from langchain_classic.prompts import PromptTemplate
-from services.rag_service import get_retriever
+from fastapi.concurrency import run_in_threadpool
+from services.rag_service import retrieve
+from services import llm_cache
+from services import query_cache
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from langchain_classic.schema import HumanMessage, SystemMessage
 import openai
 
-llm = ChatOpenAI(
-    model_name="gpt-4o", 
-    temperature=0,
-    openai_api_key=os.getenv("OPENAI_API_KEY")
-)
+# "fake" swaps GPT-4o for a local model that streams a canned chat reply and
+# answers the analysis/strategy prompts with valid JSON, for exercising every
+# LLM path without an API key
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_MODEL_NAME = "fake" if LLM_BACKEND == "fake" else "gpt-4o"
+
+def _build_llm():
+    if LLM_BACKEND == "fake":
+        from services.fake_llm import FakeLegalChatModel
+        return FakeLegalChatModel(sleep=float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.01")))
+    return ChatOpenAI(
+        model_name=LLM_MODEL_NAME, 
+        temperature=0,
+        openai_api_key=os.getenv("OPENAI_API_KEY")
+    )
+
+llm = _build_llm()
+
+_openai_client = None
+
+def get_openai_client():
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = openai.AsyncOpenAI()
+    return _openai_client
 '''
 def get_chat_response(case_id: str, user_query: str):
     """
@@ -53,47 +76,137 @@ def get_chat_response(case_id: str, user_query: str):
         print(f"Error in LLM generation: {e}")
         return "I encountered an error processing your request."
 '''
-def get_chat_response(case_id: str, user_query: str):
-    retriever = get_retriever(case_id=case_id)
-    
-    try:
-        retrieved_docs = retriever.invoke(user_query) 
-        print(f"\n🔍 DEBUG: Retrieved {len(retrieved_docs)} chunks for query: '{user_query}'")
-        for i, doc in enumerate(retrieved_docs):
-            print(f"   Chunk {i+1}: {doc.page_content[:100]}...") 
-    except Exception as e:
-        print(f"⚠️ DEBUG Error retrieving docs: {e}")
-
-    prompt_template = """
+CHAT_PROMPT = PromptTemplate(template="""
     You are LexGuard, an AI Corporate Lawyer.
     Use the provided legal context to answer the question.
     If the answer is not in the context, say "I couldn't find that information in the documents."
     
+    Use the conversation so far to resolve follow-up questions.
+    
+    Conversation so far:
+    {history}
+    
     Context:
     {context}
     
     Question: {question}
     
     Answer:
+    """, input_variables=["history", "context", "question"])
+
+def _sources(docs) -> list:
     """
-    
-    PROMPT = PromptTemplate(template=prompt_template, input_variables=["context", "question"])
-    
-    qa_chain = RetrievalQA.from_chain_type(
-        llm=llm, 
-        chain_type="stuff", 
-        retriever=retriever,
-        chain_type_kwargs={"prompt": PROMPT}
-    )
-    
-    return qa_chain.run(user_query)
+    Where the context came from, one entry per chunk: document, page and chunk id.
+    """
+    return [
+        {
+            "doc_id": doc.metadata.get("doc_id"),
+            "page": doc.metadata.get("page"),
+            "chunk_id": doc.metadata.get("chunk_id")
+        }
+        for doc in docs
+    ]
 
-def analyze_document_text(text_content: str):
+async def build_chat_prompt(case_id: str, user_query: str, history: str = ""):
     """
-    Sends document text to LLM to extract structured legal metadata.
-    Returns a Python dictionary (JSON).
+    Retrieves the case's relevant chunks and "stuffs" them into the chat prompt.
+    Returns the prompt, the sources it was built from and whether retrieval
+    worked (if not, the prompt has no context and the answer isn't cached).
+    """
+    retrieved_docs = []
+    retrieved = True
+    try:
+        # Embedding, vector and BM25 search are all blocking work
+        retrieved_docs = await run_in_threadpool(retrieve, case_id, user_query) 
+        print(f"\n🔍 DEBUG: Retrieved {len(retrieved_docs)} chunks for query: '{user_query}'")
+        for i, doc in enumerate(retrieved_docs):
+            print(f"   Chunk {i+1}: {doc.page_content[:100]}...") 
+    except Exception as e:
+        retrieved = False
+        print(f"⚠️ DEBUG Error retrieving docs: {e}")
+
+    context = "\n\n".join(doc.page_content for doc in retrieved_docs)
+    prompt = CHAT_PROMPT.format(history=history or "(none)", context=context, question=user_query)
+    return prompt, _sources(retrieved_docs), retrieved
+
+async def _cached_answer(case_id: str, user_query: str):
+    # Follow-ups ("and for the other party?") depend on the conversation,
+    # not just the wording, so they are neither looked up nor stored
+    if not query_cache.is_standalone(user_query):
+        return None
+    try:
+        return await run_in_threadpool(query_cache.lookup, case_id, user_query)
+    except Exception as e:
+        print(f"⚠️ Query cache lookup failed: {e}")
+        return None
+
+async def _remember_answer(case_id: str, user_query: str, answer: str, sources: list, retrieved: bool):
+    # An answer written without the case's documents must not be replayed
+    if not retrieved or not query_cache.is_standalone(user_query):
+        return
+    try:
+        await run_in_threadpool(query_cache.store, case_id, user_query, answer, sources)
+    except Exception as e:
+        print(f"⚠️ Query cache store failed: {e}")
+
+async def get_chat_response(case_id: str, user_query: str, history: str = "") -> dict:
+    """
+    Answers a chat question: {"answer", "sources", "cached"}. A near-identical
+    earlier question in the same case is answered from the query cache
+    without retrieval or an LLM call, unless the question refers back to
+    the conversation.
+    """
+    cached = await _cached_answer(case_id, user_query)
+    if cached is not None:
+        print(f"✅ Query cache hit ({cached['similarity']}): '{cached['question']}'")
+        return {"answer": cached["answer"], "sources": cached["sources"], "cached": True}
+
+    prompt, sources, retrieved = await build_chat_prompt(case_id, user_query, history)
+    response = await llm.ainvoke(prompt)
+    await _remember_answer(case_id, user_query, response.content, sources, retrieved)
+    return {"answer": response.content, "sources": sources, "cached": False}
+
+async def stream_chat_response(case_id: str, user_query: str, history: str = ""):
+    """
+    Same as get_chat_response, as (event, data) pairs: one `sources` event,
+    then a `token` event per chunk the model produces. A cached answer comes
+    back as a single token.
+    """
+    cached = await _cached_answer(case_id, user_query)
+    if cached is not None:
+        print(f"✅ Query cache hit ({cached['similarity']}): '{cached['question']}'")
+        yield "sources", {"sources": cached["sources"], "cached": True}
+        yield "token", cached["answer"]
+        return
+
+    prompt, sources, retrieved = await build_chat_prompt(case_id, user_query, history)
+    yield "sources", {"sources": sources, "cached": False}
+    parts = []
+    async for chunk in llm.astream(prompt):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield "token", chunk.content
+    await _remember_answer(case_id, user_query, "".join(parts), sources, retrieved)
+
+SUMMARY_PROMPT = """
+    You maintain a running summary of a conversation between a user and LexGuard,
+    an AI Corporate Lawyer. Update the existing summary with the new turns.
+    Keep facts, figures, parties, clause references and open questions; drop pleasantries.
+    Return only the updated summary, at most 200 words.
+    """
+
+async def summarize_conversation(previous_summary: str, transcript: str) -> str:
+    """
+    Folds older chat turns into the case's rolling conversation summary.
     """
-    system_prompt = """
+    messages = [
+        SystemMessage(content=SUMMARY_PROMPT),
+        HumanMessage(content=f"EXISTING SUMMARY:\n{previous_summary or '(none)'}\n\nNEW TURNS:\n{transcript}")
+    ]
+    response = await llm.ainvoke(messages)
+    return response.content.strip()
+
+ANALYSIS_SYSTEM_PROMPT = """
     You are an experienced Indian corporate lawyer. 
     Analyze the legal document text provided and return a STRICT JSON object with these keys:
     - parties (list of strings)
@@ -106,31 +219,118 @@ def analyze_document_text(text_content: str):
     
     Do not add markdown formatting (like ```json). Just return the raw JSON string.
     """
+
+ANALYSIS_MERGE_PROMPT = """
+    You are an experienced Indian corporate lawyer. 
+    You are given JSON analyses of consecutive sections of ONE legal document.
+    Merge them into a single STRICT JSON object with exactly the same keys:
+    - parties (list of strings, de-duplicated)
+    - agreement_type (string)
+    - termination_clause (summary string)
+    - payment_terms (summary string)
+    - liability_indemnity (summary string)
+    - risk_rating (High/Medium/Low, the highest justified by any section)
+    - key_risks (list of strings, de-duplicated)
     
-    truncated_text = text_content[:15000]
-    
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=f"Document Text:\n{truncated_text}")
-    ]
+    Do not add markdown formatting (like ```json). Just return the raw JSON string.
+    """
+
+# Documents up to this size are analyzed in one call; longer ones are split
+# into sections of about ANALYSIS_SECTION_CHARS, analyzed in parallel, then merged
+ANALYSIS_SINGLE_PASS_CHARS = int(os.getenv("ANALYSIS_SINGLE_PASS_CHARS", "15000"))
+ANALYSIS_SECTION_CHARS = int(os.getenv("ANALYSIS_SECTION_CHARS", "12000"))
+ANALYSIS_MAX_CONCURRENCY = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "4"))
+ANALYSIS_MERGE_FANIN = int(os.getenv("ANALYSIS_MERGE_FANIN", "8"))
+
+def _invoke_json(messages):
+    # Same prompt + model -> same answer, so repeats cost no tokens
+    cache_key = llm_cache.prompt_key(LLM_MODEL_NAME, messages)
+    cached = llm_cache.lookup(cache_key)
+    if cached is not None:
+        return json.loads(cached)
+
+    response = llm.invoke(messages)
+    content = response.content.strip()
     
-    try:
-        response = llm.invoke(messages)
-        content = response.content.strip()
+    if content.startswith("```json"):
+        content = content.replace("```json", "").replace("```", "")
         
-        if content.startswith("```json"):
-            content = content.replace("```json", "").replace("```", "")
-            
-        return json.loads(content)
-    except Exception as e:
-        print(f"Error analyzing document: {e}")
-        return {"error": "Failed to analyze document"}
-    
-def generate_case_strategy(case_summary: str, doc_analyses: list):
+    result = json.loads(content)
+    llm_cache.store(cache_key, content)
+    return result
+
+def _analyze_section(text: str):
+    return _invoke_json([
+        SystemMessage(content=ANALYSIS_SYSTEM_PROMPT),
+        HumanMessage(content=f"Document Text:\n{text}")
+    ])
+
+def _merge_analyses(analyses: list):
+    return _invoke_json([
+        SystemMessage(content=ANALYSIS_MERGE_PROMPT),
+        HumanMessage(content=f"Section Analyses:\n{json.dumps(analyses, indent=2)}")
+    ])
+
+def _group_sections(chunks: list, max_chars: int):
     """
-    Generates a legal strategy based on case details and analyzed documents.
+    Packs consecutive chunks into sections of at most max_chars.
     """
-    system_prompt = """
+    sections, current, size = [], [], 0
+    for chunk in chunks:
+        if current and size + len(chunk) > max_chars:
+            sections.append("\n".join(current))
+            current, size = [], 0
+        current.append(chunk)
+        size += len(chunk)
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+def _map_reduce_analysis(chunks: list):
+    sections = _group_sections(chunks, ANALYSIS_SECTION_CHARS)
+    print(f"Analyzing {len(sections)} sections (map-reduce)...")
+
+    with ThreadPoolExecutor(max_workers=ANALYSIS_MAX_CONCURRENCY) as pool:
+        futures = [pool.submit(_analyze_section, section) for section in sections]
+        partials, failed = [], []
+        for i, future in enumerate(futures):
+            try:
+                partials.append(future.result())
+            except Exception as e:
+                print(f"Error analyzing section {i + 1}/{len(sections)}: {e}")
+                failed.append(i + 1)
+
+        # Merging what is left would store an analysis that silently misses
+        # clauses. Sections that succeeded are in the LLM cache, so a retry
+        # of the whole analysis only calls the LLM again for the failed ones.
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(sections)} sections failed to analyze: {failed}")
+
+        # Merge in rounds so no single prompt holds every partial of a huge document
+        while len(partials) > 1:
+            groups = [partials[i:i + ANALYSIS_MERGE_FANIN] for i in range(0, len(partials), ANALYSIS_MERGE_FANIN)]
+            partials = list(pool.map(lambda group: group[0] if len(group) == 1 else _merge_analyses(group), groups))
+
+    return partials[0]
+
+def analyze_document_text(text_content: str, chunks: list = None):
+    """
+    Sends document text to LLM to extract structured legal metadata.
+    Returns a Python dictionary (JSON).
+
+    Long documents are analyzed section by section from `chunks` (the
+    splits produced at ingestion, or `text_content` split here) and the
+    results merged, so nothing past the first 15,000 characters is dropped.
+
+    LLM and parsing errors are raised, so the caller's job stage can retry.
+    """
+    if len(text_content) <= ANALYSIS_SINGLE_PASS_CHARS:
+        return _analyze_section(text_content)
+    if not chunks:
+        chunks = [text_content[i:i + ANALYSIS_SECTION_CHARS] for i in range(0, len(text_content), ANALYSIS_SECTION_CHARS)]
+    return _map_reduce_analysis(chunks)
+    
+STRATEGY_SYSTEM_PROMPT = """
     You are a Senior Legal Strategist. Based on the case summary and document analysis provided, 
     output a strategic plan in JSON format with:
     - summary (brief overview)
@@ -138,29 +338,59 @@ def generate_case_strategy(case_summary: str, doc_analyses: list):
     - aggressive_plan (list of assertive steps)
     - missing_documents (what else is needed)
     """
-    
+
+def _strategy_messages(case_summary: str, doc_analyses: list):
     user_content = f"""
     CASE SUMMARY: {case_summary}
     
     DOCUMENT ANALYSES:
     {json.dumps(doc_analyses, indent=2)}
     """
-    
-    messages = [
-        SystemMessage(content=system_prompt),
+    return [
+        SystemMessage(content=STRATEGY_SYSTEM_PROMPT),
         HumanMessage(content=user_content)
     ]
-    
+
+async def generate_case_strategy(case_summary: str, doc_analyses: list, case_id: str = None, refresh: bool = False):
+    """
+    Generates a legal strategy based on case details and analyzed documents.
+    Responses are cached per prompt and dropped when the case's documents
+    change; `refresh` skips the cached response and replaces it.
+    """
+    messages = _strategy_messages(case_summary, doc_analyses)
+    cache_key = llm_cache.prompt_key(LLM_MODEL_NAME, messages)
+    if not refresh:
+        cached = await run_in_threadpool(llm_cache.lookup, cache_key)
+        if cached is not None:
+            return cached
+
+    response = await llm.ainvoke(messages)
+    await run_in_threadpool(llm_cache.store, cache_key, response.content, case_id)
+    return response.content
+
+def generate_case_strategy_sync(case_summary: str, doc_analyses: list, case_id: str = None, refresh: bool = False):
+    """
+    Blocking generate_case_strategy for job workers, which have no event loop
+    of their own and must not share the async HTTP client of the API's loop.
+    """
+    messages = _strategy_messages(case_summary, doc_analyses)
+    cache_key = llm_cache.prompt_key(LLM_MODEL_NAME, messages)
+    if not refresh:
+        cached = llm_cache.lookup(cache_key)
+        if cached is not None:
+            return cached
+
     response = llm.invoke(messages)
+    llm_cache.store(cache_key, response.content, case_id)
     return response.content
 
-def transcribe_audio(file_path: str):
+async def transcribe_audio(file_path: str):
     """
     Uses OpenAI Whisper API to convert audio file to text.
     """
     try:
         with open(file_path, "rb") as audio_file:
-            transcript = openai.audio.transcriptions.create(
+            transcript = await get_openai_client().audio.transcriptions.create(
                 model="whisper-1", 
                 file=audio_file
             )
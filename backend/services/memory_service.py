@@ -0,0 +1,82 @@
+import os
+import threading
+from sqlalchemy import select
+from models.models import Case, CaseMessage
+from services.llm_service import summarize_conversation
+
+# Recent turns kept verbatim in the prompt; anything older is folded into the
+# case's rolling summary. Folding goes down to half the budget so it happens
+# every few turns rather than on every message.
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000"))
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.encoding_for_model("gpt-4o")
+                except Exception as e:
+                    print(f"⚠️ Token encoding unavailable, estimating instead: {e}")
+                    _encoding = False
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if not encoding:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+def _format_turn(sender: str, content: str) -> str:
+    return f"{'User' if sender == 'user' else 'LexGuard'}: {content}"
+
+async def load_chat_history(db, case: Case) -> str:
+    """
+    Conversation context for the next answer: the rolling summary followed
+    by the most recent turns that fit in CHAT_HISTORY_TOKEN_BUDGET.
+
+    Only messages newer than the summary are loaded, and their token counts
+    are stored on the rows, so each request touches a short tail of the chat.
+    """
+    query = select(CaseMessage.sender, CaseMessage.content, CaseMessage.token_count, CaseMessage.created_at)\
+        .where(CaseMessage.case_id == case.id)\
+        .order_by(CaseMessage.created_at)
+    if case.chat_summary_until is not None:
+        query = query.where(CaseMessage.created_at > case.chat_summary_until)
+    rows = (await db.execute(query)).all()
+
+    turns = [
+        (sender, content, token_count if token_count is not None else count_tokens(content), created_at)
+        for sender, content, token_count, created_at in rows
+    ]
+    total = sum(tokens for _, _, tokens, _ in turns)
+
+    summary = case.chat_summary
+    if total > CHAT_HISTORY_TOKEN_BUDGET:
+        # Fold the oldest turns into the summary until the tail is half the budget
+        fold = 0
+        while fold < len(turns) and total > CHAT_HISTORY_TOKEN_BUDGET // 2:
+            total -= turns[fold][2]
+            fold += 1
+        folded, turns = turns[:fold], turns[fold:]
+        try:
+            summary = await summarize_conversation(
+                summary,
+                "\n".join(_format_turn(sender, content) for sender, content, _, _ in folded)
+            )
+            case.chat_summary = summary
+            case.chat_summary_until = folded[-1][3]
+            await db.commit()
+        except Exception as e:
+            # Answer with the recent turns only; folding is retried next message
+            print(f"⚠️ Error summarizing chat history: {e}")
+
+    parts = []
+    if summary:
+        parts.append(f"Summary of earlier conversation: {summary}")
+    parts.extend(_format_turn(sender, content) for sender, content, _, _ in turns)
+    return "\n".join(parts)
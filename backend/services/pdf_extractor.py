@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+# 0 or 1 extracts in the calling thread; more fans page ranges out to a
+# process pool shared by every ingestion job
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "25"))
+# Small PDFs aren't worth the process round trip
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "100"))
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _get_pool(workers: int):
+    """
+    The shared pool, rebuilt when a caller asks for a different number of
+    workers. Ranges already submitted to the old pool still finish.
+    """
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        with _pool_lock:
+            if _pool is None or _pool_workers != workers:
+                if _pool is not None:
+                    _pool.shutdown(wait=False)
+                _pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                _pool_workers = workers
+    return _pool
+
+def _discard_pool(broken):
+    """
+    Drops a pool whose worker died (OOM kill on a hostile PDF, crash): once
+    broken, a ProcessPoolExecutor fails every call. The next _get_pool()
+    builds a new one. Only the caller that still sees `broken` installed
+    drops it.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+            broken.shutdown(wait=False, cancel_futures=True)
+            print("⚠️ PDF extraction pool broke; starting a new one.")
+
+def _submit_range(file_path: str, start: int, stop: int, workers: int):
+    pool = _get_pool(workers)
+    try:
+        return pool, pool.submit(extract_page_range, file_path, start, stop)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        pool = _get_pool(workers)
+        return pool, pool.submit(extract_page_range, file_path, start, stop)
+
+def _range_result(file_path: str, start: int, stop: int, workers: int, pool, future) -> list:
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        # Retry once on a fresh pool
+        _discard_pool(pool)
+        return _get_pool(workers).submit(extract_page_range, file_path, start, stop).result()
+
+def count_pages(file_path: str) -> int:
+    return len(PdfReader(file_path).pages)
+
+def extract_page_range(file_path: str, start: int, stop: int) -> list:
+    """
+    Text of pages [start, stop). Each call opens its own reader, so only one
+    range's parsed objects are held in memory at a time.
+    """
+    reader = PdfReader(file_path)
+    texts = []
+    for page_number in range(start, min(stop, len(reader.pages))):
+        try:
+            texts.append(reader.pages[page_number].extract_text() or "")
+        except Exception as e:
+            print(f"⚠️ Could not extract page {page_number} of {file_path}: {e}")
+            texts.append("")
+    return texts
+
+def _page_ranges(total_pages: int, pages_per_task: int):
+    for start in range(0, total_pages, pages_per_task):
+        yield start, min(start + pages_per_task, total_pages)
+
+def iter_pdf_pages(file_path: str, workers: int = PDF_EXTRACT_WORKERS,
+                   pages_per_task: int = PDF_PAGES_PER_TASK):
+    """
+    Yields one Document per page, in order, without loading the whole PDF.
+    With workers > 1, page ranges are extracted in parallel and at most
+    2 * workers ranges are in flight, so memory stays bounded for any length.
+    """
+    total_pages = count_pages(file_path)
+
+    def to_documents(start, texts):
+        for offset, text in enumerate(texts):
+            yield Document(
+                page_content=text,
+                metadata={"source": file_path, "page": start + offset, "total_pages": total_pages}
+            )
+
+    ranges = _page_ranges(total_pages, max(1, pages_per_task))
+
+    if workers <= 1 or total_pages < PDF_PARALLEL_MIN_PAGES:
+        for start, stop in ranges:
+            yield from to_documents(start, extract_page_range(file_path, start, stop))
+        return
+
+    in_flight = deque()
+    for start, stop in ranges:
+        in_flight.append((start, stop, *_submit_range(file_path, start, stop, workers)))
+        if len(in_flight) >= 2 * workers:
+            first, last, pool, future = in_flight.popleft()
+            yield from to_documents(first, _range_result(file_path, first, last, workers, pool, future))
+    while in_flight:
+        first, last, pool, future = in_flight.popleft()
+        yield from to_documents(first, _range_result(file_path, first, last, workers, pool, future))
\ No newline at end of file
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import numpy as np
+from core.disk_cache import DiskCache
+from services.rag_service import get_embeddings
+
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "./query_cache/queries.db")
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "20000"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", str(24 * 3600)))
+# Cosine similarity a new question needs to reuse an earlier answer. High on
+# purpose: "notice period for termination" must not answer "notice period for renewal".
+QUERY_CACHE_THRESHOLD = float(os.getenv("QUERY_CACHE_THRESHOLD", "0.92"))
+# Most recently used questions compared per lookup
+QUERY_CACHE_MAX_PER_CASE = int(os.getenv("QUERY_CACHE_MAX_PER_CASE", "500"))
+
+# Words that only make sense against earlier turns ("what about the other
+# party?", "is that enforceable?"). Questions using them are answered fresh;
+# any other question is cached whatever was said before it.
+_CONTEXT_REFERENCE_RE = re.compile(
+    r"^\s*(and|but|so|or|then|also|what about|how about)\b"
+    r"|\b(it|its|this|that|these|those|they|them|their|he|she|him|her|his|"
+    r"above|previous|earlier|former|latter|same|other|else)\b",
+    re.IGNORECASE
+)
+
+_cache = None
+_cache_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+def get_query_cache() -> DiskCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskCache(QUERY_CACHE_PATH, QUERY_CACHE_MAX_ENTRIES, ttl_seconds=QUERY_CACHE_TTL_SECONDS)
+    return _cache
+
+def _tag(case_id: str) -> str:
+    return f"case:{case_id}"
+
+def _key(case_id: str, question: str) -> str:
+    normalized = " ".join(question.lower().split())
+    return hashlib.sha256(f"{case_id}\0{normalized}".encode("utf-8")).hexdigest()
+
+def _embed(question: str) -> np.ndarray:
+    vector = np.asarray(get_embeddings().embed_query(question), dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+# Entry layout: dimension (uint32), unit-length float32 vector, JSON payload
+def _pack(vector: np.ndarray, payload: dict) -> bytes:
+    return struct.pack("<I", len(vector)) + vector.tobytes() + json.dumps(payload).encode("utf-8")
+
+def _unpack(value: bytes):
+    (dim,) = struct.unpack_from("<I", value)
+    end = 4 + dim * 4
+    return np.frombuffer(value, dtype=np.float32, count=dim, offset=4), value[end:]
+
+def is_standalone(question: str) -> bool:
+    """
+    True if the question can be answered without the conversation before
+    it, so a cached answer to a similar question applies.
+    """
+    return not _CONTEXT_REFERENCE_RE.search(question)
+
+def _count(hit: bool):
+    global _hits, _misses
+    with _stats_lock:
+        if hit:
+            _hits += 1
+        else:
+            _misses += 1
+
+def lookup(case_id: str, question: str):
+    """
+    Answer to the most similar earlier question in the case, if it clears
+    QUERY_CACHE_THRESHOLD: {"question", "answer", "sources", "similarity"}.
+    """
+    if not QUERY_CACHE_ENABLED or not case_id:
+        return None
+    cache = get_query_cache()
+    entries = cache.get_tag(_tag(case_id), limit=QUERY_CACHE_MAX_PER_CASE)
+    if not entries:
+        _count(False)
+        return None
+
+    keys = list(entries)
+    unpacked = [_unpack(entries[key]) for key in keys]
+    query = _embed(question)
+    # Entries from another embedding model can't be compared; skip them
+    comparable = [i for i, (vector, _) in enumerate(unpacked) if len(vector) == len(query)]
+    if not comparable:
+        _count(False)
+        return None
+
+    similarities = np.stack([unpacked[i][0] for i in comparable]) @ query
+    best = int(np.argmax(similarities))
+    similarity = float(similarities[best])
+    if similarity < QUERY_CACHE_THRESHOLD:
+        _count(False)
+        return None
+
+    key = keys[comparable[best]]
+    cache.get(key)  # refreshes LRU recency
+    _count(True)
+    result = json.loads(unpacked[comparable[best]][1])
+    result["similarity"] = round(similarity, 4)
+    return result
+
+def store(case_id: str, question: str, answer: str, sources: list):
+    if not QUERY_CACHE_ENABLED or not case_id:
+        return
+    payload = {"question": question, "answer": answer, "sources": sources}
+    get_query_cache().set(_key(case_id, question), _pack(_embed(question), payload), tag=_tag(case_id))
+
+def invalidate_case(case_id: str) -> int:
+    """
+    Drops a case's cached answers. Called whenever its documents change.
+    """
+    return get_query_cache().invalidate_tag(_tag(case_id))
+
+def get_query_cache_stats():
+    stats = get_query_cache().stats()
+    with _stats_lock:
+        lookups = _hits + _misses
+        stats.update({
+            "hits": _hits,
+            "misses": _misses,
+            "hit_rate": round(_hits / lookups, 4) if lookups else 0.0,
+            "threshold": QUERY_CACHE_THRESHOLD,
+        })
+    return stats
\ No newline at end of file
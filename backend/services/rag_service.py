@@ -1,48 +1,205 @@
 import os
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
+import threading
+from collections import OrderedDict
+from services.embedding_batcher import BatchedEmbeddings, EMBED_BATCH_SIZE
+from services.embedding_cache import CachedEmbeddings
+from services import lexical_index
+from services import reranker
 
 CHROMA_DB_DIR = "./chroma_db"
+# "chroma" keeps one global collection filtered on case_id; "mmap" keeps one
+# memory-mapped index per case (see services/vector_store.py)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+RETRIEVER_CACHE_SIZE = int(os.getenv("RETRIEVER_CACHE_SIZE", "256"))
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "4"))
+# Candidates taken from each of the vector and BM25 rankings before fusion
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+RRF_K = 60
+VECTOR_DELETE_BATCH = int(os.getenv("VECTOR_DELETE_BATCH", "500"))
 
-print("Loading Embedding Model...")
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+# The embedding model (and torch behind it) is loaded on first use or by the
+# startup warm-up thread, never at import time.
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+# One vector store handle per process, shared by every router and background task.
+_vector_db = None
+_vector_db_lock = threading.Lock()
+_write_lock = threading.Lock()
+_ready = threading.Event()
+
+# case_id -> retriever, most recently used last
+_retrievers = OrderedDict()
+_retrievers_lock = threading.Lock()
+
+def get_embeddings():
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                from langchain_community.embeddings import HuggingFaceEmbeddings
+                print("Loading Embedding Model...")
+                # Cache hits skip the model entirely; misses from concurrent
+                # uploads and chats share one micro-batching queue
+                batched = BatchedEmbeddings(HuggingFaceEmbeddings(
+                    model_name=EMBEDDING_MODEL,
+                    encode_kwargs={"batch_size": EMBED_BATCH_SIZE}
+                ))
+                _embeddings = CachedEmbeddings(batched, model_name=EMBEDDING_MODEL)
+    return _embeddings
+
+def get_embedding_cache_stats():
+    if _embeddings is None:
+        return None
+    return _embeddings.cache.stats()
+
+def init_vector_db():
+    """
+    Opens the persisted vector store once. Later calls just return the
+    existing handle.
+    """
+    global _vector_db
+    if _vector_db is None:
+        with _vector_db_lock:
+            if _vector_db is None:
+                if VECTOR_BACKEND == "mmap":
+                    from services.vector_store import MmapVectorStore
+                    _vector_db = MmapVectorStore(get_embeddings())
+                else:
+                    from langchain_community.vectorstores import Chroma
+                    _vector_db = Chroma(
+                        persist_directory=CHROMA_DB_DIR,
+                        embedding_function=get_embeddings()
+                    )
+                _ready.set()
+                print("✅ Vector DB ready.")
+    return _vector_db
+
+def warm_up_vector_db():
+    """
+    Loads the embedding model, opens the vector store and runs one dummy
+    query so the first real chat or upload doesn't pay for it.
+    """
+    try:
+        init_vector_db()
+        get_embeddings().embed_query("warm up")
+        if reranker.RERANK_ENABLED:
+            reranker.get_cross_encoder()
+    except Exception as e:
+        print(f"⚠️ Vector DB warm-up failed: {e}")
+
+def start_vector_db_warm_up():
+    thread = threading.Thread(target=warm_up_vector_db, name="vector-db-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+def is_vector_db_ready() -> bool:
+    return _ready.is_set()
 
 def get_vector_db():
-    return Chroma(
-        persist_directory=CHROMA_DB_DIR,
-        embedding_function=embeddings
-    )
+    return init_vector_db()
 
 def add_documents_to_db(splits):
     if not splits:
         return
     db = get_vector_db()
-    db.add_documents(splits)
+    # Stable chunk ids make re-processing a document an upsert, not a duplicate
+    ids = [split.metadata.get("chunk_id") for split in splits]
+    with _write_lock:
+        db.add_documents(splits, ids=ids if all(ids) else None)
     print(f"✅ Added {len(splits)} chunks to Vector DB.")
 
+def _candidate_count() -> int:
+    if reranker.RERANK_ENABLED:
+        return max(RETRIEVAL_CANDIDATES, reranker.RERANK_CANDIDATES)
+    return RETRIEVAL_CANDIDATES if HYBRID_SEARCH else RETRIEVAL_K
+
 def get_retriever(case_id: str = None):
     """
-    Returns a retriever that filters by case_id to ensure we only 
-    read relevant documents.
+    Returns a retriever that filters by case_id to ensure we only
+    read relevant documents. Retrievers are cached per case.
     """
+    with _retrievers_lock:
+        retriever = _retrievers.get(case_id)
+        if retriever is not None:
+            _retrievers.move_to_end(case_id)
+            return retriever
+
     db = get_vector_db()
-    
-    search_kwargs = {"k": 4} 
-    
+
+    search_kwargs = {"k": _candidate_count()}
+
     if case_id:
         search_kwargs["filter"] = {"case_id": case_id}
-        
-    return db.as_retriever(search_kwargs=search_kwargs)
 
-def delete_case_vectors(case_id: str):
+    retriever = db.as_retriever(search_kwargs=search_kwargs)
+
+    with _retrievers_lock:
+        _retrievers[case_id] = retriever
+        while len(_retrievers) > RETRIEVER_CACHE_SIZE:
+            _retrievers.popitem(last=False)
+    return retriever
+
+def _chunk_key(doc):
+    return doc.metadata.get("chunk_id") or doc.page_content
+
+def reciprocal_rank_fusion(rankings, k: int):
+    """
+    Merges ranked lists of chunks: each list adds 1 / (RRF_K + rank) to a
+    chunk's score, so chunks ranked well by both retrievers win.
     """
-    Deletes all vector embeddings associated with a specific case_id.
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = _chunk_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+            docs.setdefault(key, doc)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [docs[key] for key in best]
+
+def retrieve(case_id: str, query: str, k: int = RETRIEVAL_K):
+    """
+    Chunks for the chat prompt. Dense MiniLM results are fused with BM25
+    over the case's lexical index, which catches exact section numbers,
+    party names and defined terms that embeddings tend to miss.
+
+    With re-ranking on, the top RERANK_CANDIDATES of that are re-scored by
+    the cross-encoder and only the best k go to the LLM.
+    """
+    pool_size = reranker.RERANK_CANDIDATES if reranker.RERANK_ENABLED else k
+    vector_docs = get_retriever(case_id).invoke(query)
+    if not HYBRID_SEARCH or not case_id:
+        candidates = vector_docs[:pool_size]
+    else:
+        lexical_docs = lexical_index.search(case_id, query, _candidate_count())
+        candidates = reciprocal_rank_fusion([vector_docs, lexical_docs], pool_size)
+
+    if reranker.RERANK_ENABLED:
+        return reranker.rerank(query, candidates, k)
+    return candidates
+
+def delete_case_vectors(case_id: str) -> int:
+    """
+    Deletes all vector embeddings associated with a specific case_id, in
+    batches so one large case doesn't hold the write lock for long. Returns
+    how many were removed; safe to call again after a failure.
     """
     db = get_vector_db()
-    try:
-        db.delete(where={"case_id": case_id})
-        print(f"✅ Deleted vectors for case: {case_id}")
-        return True
-    except Exception as e:
-        print(f"⚠️ Error deleting vectors for case {case_id}: {e}")
-        return False
\ No newline at end of file
+    with _retrievers_lock:
+        _retrievers.pop(case_id, None)
+    if VECTOR_BACKEND == "mmap":
+        with _write_lock:
+            removed = db.delete(where={"case_id": case_id})
+    else:
+        removed = 0
+        while True:
+            with _write_lock:
+                ids = db.get(where={"case_id": case_id}, limit=VECTOR_DELETE_BATCH, include=[])["ids"]
+                if not ids:
+                    break
+                db.delete(ids=ids)
+            removed += len(ids)
+    print(f"✅ Deleted {removed} vectors for case: {case_id}")
+    return removed
\ No newline at end of file
@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from sqlalchemy import delete
+from core.database import SessionLocal
+from models.models import Case, CaseMessage, Document, DocumentContent, Job
+from services.job_queue import JobContext, job_handler, cancel_jobs, JOB_LEASE_SECONDS, JOB_POLL_SECONDS
+from services.document_service import has_upload_hold
+from services.rag_service import delete_case_vectors
+from services.lexical_index import delete_case_index
+from services import llm_cache
+from services import query_cache
+
+RECLAIM_BATCH_SIZE = int(os.getenv("RECLAIM_BATCH_SIZE", "100"))
+# How long to wait for the case's running document jobs to stop
+RECLAIM_INGEST_WAIT_SECONDS = float(os.getenv("RECLAIM_INGEST_WAIT_SECONDS", str(JOB_LEASE_SECONDS)))
+
+# Totals since the process started, reported under /metrics
+_stats = {"cases": 0, "files": 0, "bytes": 0, "vectors": 0, "documents": 0, "messages": 0}
+_stats_lock = threading.Lock()
+
+def _count(**amounts):
+    with _stats_lock:
+        for key, amount in amounts.items():
+            _stats[key] += amount
+
+def get_reclaim_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+def _is_file_referenced(path: str, case_id: str) -> bool:
+    # Fresh session: must see rows committed after this batch's first read
+    db = SessionLocal()
+    try:
+        return has_upload_hold(path) or db.query(Document.id)\
+            .filter(Document.s3_key == path, Document.case_id != case_id)\
+            .first() is not None
+    finally:
+        db.close()
+
+def _remove_file(path: str, case_id: str) -> int:
+    """
+    Deletes a content-addressed file and returns its size; 0 if it is
+    already gone or still in use. The file is moved aside first and only
+    deleted if no upload took a hold on it or committed a reference to it
+    meanwhile; otherwise it is put back.
+    """
+    tombstone = path + ".reclaim"
+    if not os.path.exists(tombstone):
+        try:
+            os.replace(path, tombstone)
+        except FileNotFoundError:
+            return 0
+    if _is_file_referenced(path, case_id):
+        os.replace(tombstone, path)
+        return 0
+    size = os.path.getsize(tombstone)
+    os.remove(tombstone)
+    return size
+
+def _in_transaction(db, fn, *args):
+    try:
+        return fn(db, *args)
+    except Exception:
+        # Leaves the session usable for the stage's retry
+        db.rollback()
+        raise
+
+def _reclaim_documents(db, case_id: str):
+    """
+    Deletes one batch of the case's documents: their files first (unless
+    another case's document shares the same content-addressed file), then
+    the rows. A crash in between just repeats the batch, and files that are
+    already gone count as 0 bytes. Returns (documents, files, bytes).
+    """
+    rows = db.query(Document.id, Document.s3_key)\
+        .filter(Document.case_id == case_id)\
+        .limit(RECLAIM_BATCH_SIZE)\
+        .all()
+    if not rows:
+        return 0, 0, 0
+
+    paths = {path for _, path in rows if path}
+    shared = {
+        path for (path,) in db.query(Document.s3_key)
+        .filter(Document.s3_key.in_(paths), Document.case_id != case_id)
+        .all()
+    } if paths else set()
+
+    files = reclaimed = 0
+    for path in paths - shared:
+        size = _remove_file(path, case_id)
+        if size:
+            files += 1
+            reclaimed += size
+
+    doc_ids = [doc_id for doc_id, _ in rows]
+    db.execute(delete(DocumentContent).where(DocumentContent.document_id.in_(doc_ids)))
+    db.execute(delete(Document).where(Document.id.in_(doc_ids)))
+    db.commit()
+    return len(rows), files, reclaimed
+
+def _reclaim_messages(db, case_id: str) -> int:
+    ids = [message_id for (message_id,) in db.query(CaseMessage.id)
+           .filter(CaseMessage.case_id == case_id)
+           .limit(RECLAIM_BATCH_SIZE * 10)
+           .all()]
+    if ids:
+        db.execute(delete(CaseMessage).where(CaseMessage.id.in_(ids)))
+        db.commit()
+    return len(ids)
+
+def _delete_case_row(db, case_id: str):
+    db.execute(delete(Case).where(Case.id == case_id))
+    db.commit()
+
+def _stop_case_ingestion(case_id: str) -> int:
+    """
+    Cancels the case's queued document jobs and waits for running ones to
+    end (they stop at their next check once they see the case is deleted),
+    so nothing is indexed or saved for the case after its indexes are
+    dropped. Returns the number of cancelled jobs.
+    """
+    deadline = time.time() + RECLAIM_INGEST_WAIT_SECONDS
+    cancelled = 0
+    db = SessionLocal()
+    try:
+        while True:
+            doc_ids = {doc_id for (doc_id,) in db.query(Document.id).filter(Document.case_id == case_id)}
+            job_ids = [
+                job_id for job_id, payload in db.query(Job.id, Job.payload)
+                .filter(Job.kind == "process_document", Job.status.in_(("queued", "running")))
+                .all()
+                if (payload or {}).get("doc_id") in doc_ids
+            ]
+            cancelled += cancel_jobs(db, job_ids, "Case was deleted")
+            running = db.query(Job.id).filter(Job.id.in_(job_ids), Job.status == "running").count() if job_ids else 0
+            db.commit()
+            if not running:
+                return cancelled
+            if time.time() > deadline:
+                raise RuntimeError(f"{running} document jobs of case {case_id} are still running")
+            time.sleep(JOB_POLL_SECONDS)
+    finally:
+        db.close()
+
+def _drop_case_indexes(case_id: str) -> int:
+    vectors = delete_case_vectors(case_id)
+    delete_case_index(case_id)
+    llm_cache.invalidate_case(case_id)
+    query_cache.invalidate_case(case_id)
+    return vectors
+
+@job_handler("reclaim_case")
+def reclaim_case_job(ctx: JobContext):
+    """
+    Frees everything a logically deleted case still holds, batch by batch,
+    once its document jobs are stopped: vectors and search indexes, document
+    files and rows, messages, and finally the case row. Each step only
+    removes what is left, so a retried or resumed job picks up where the
+    last attempt stopped.
+    """
+    case_id = ctx.payload["case_id"]
+    totals = {"vectors": 0, "documents": 0, "files": 0, "bytes": 0, "messages": 0}
+    db = SessionLocal()
+    try:
+        case = db.query(Case).filter(Case.id == case_id).first()
+        if case is None:
+            return {"case_id": case_id, **totals}
+        if case.deleted_at is None:
+            raise RuntimeError(f"Case {case_id} is not marked as deleted")
+
+        # Document jobs still writing to the case would re-create what is dropped
+        ctx.stage("ingest", 5, _stop_case_ingestion, case_id)
+
+        # Indexes first, so nothing is retrieved for chunks whose files are gone
+        vectors = ctx.stage("vectors", 10, _drop_case_indexes, case_id)
+        totals["vectors"] += vectors
+        _count(vectors=vectors)
+
+        while True:
+            documents, files, reclaimed = ctx.stage("documents", None, _in_transaction, db, _reclaim_documents, case_id)
+            if not documents:
+                break
+            totals["documents"] += documents
+            totals["files"] += files
+            totals["bytes"] += reclaimed
+            _count(documents=documents, files=files, bytes=reclaimed)
+        ctx.report("documents", 70)
+
+        while True:
+            messages = ctx.stage("messages", None, _in_transaction, db, _reclaim_messages, case_id)
+            if not messages:
+                break
+            totals["messages"] += messages
+            _count(messages=messages)
+        ctx.report("messages", 90)
+
+        ctx.stage("case", 100, _in_transaction, db, _delete_case_row, case_id)
+        _count(cases=1)
+
+        print(f"✅ Reclaimed case {case_id}: {totals}")
+        return {"case_id": case_id, **totals}
+    finally:
+        db.close()
\ No newline at end of file
@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+
+# Off by default: the cross-encoder is a second model to download and load
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# How many fused candidates are re-scored, and how many pairs per forward pass
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "512"))
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_cross_encoder():
+    """
+    Loads the cross-encoder on CPU on first use. Returns False if it can't be
+    loaded, in which case retrieval keeps the fused order.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    print("Loading Re-ranking Model...")
+                    _model = CrossEncoder(RERANK_MODEL, max_length=RERANK_MAX_LENGTH, device="cpu")
+                except Exception as e:
+                    print(f"⚠️ Re-ranking model unavailable, skipping re-ranking: {e}")
+                    _model = False
+    return _model
+
+def rerank(query: str, docs: list, k: int) -> list:
+    """
+    Re-scores (query, chunk) pairs with the cross-encoder in batches of
+    RERANK_BATCH_SIZE and returns the best k chunks.
+    """
+    model = get_cross_encoder()
+    if not model or len(docs) <= 1:
+        return docs[:k]
+
+    start = time.perf_counter()
+    scores = model.predict(
+        [(query, doc.page_content) for doc in docs],
+        batch_size=RERANK_BATCH_SIZE,
+        show_progress_bar=False
+    )
+    ranked = sorted(zip(scores, range(len(docs))), reverse=True)[:k]
+    print(f"⏱️ Re-ranked {len(docs)} candidates in {time.perf_counter() - start:.3f}s")
+    return [docs[i] for _, i in ranked]
\ No newline at end of file
@@ -0,0 +1,97 @@
+import hashlib
+import json
+from datetime import datetime
+from core.database import SessionLocal
+from models.models import Case, Document
+from services.job_queue import JobContext, job_handler
+from services.llm_service import generate_case_strategy, generate_case_strategy_sync
+
+SUMMARY_TEXT_LIMIT = 400
+SUMMARY_LIST_LIMIT = 8
+
+def _clip(value):
+    if isinstance(value, str):
+        return value[:SUMMARY_TEXT_LIMIT]
+    if isinstance(value, list):
+        return [_clip(item) for item in value[:SUMMARY_LIST_LIMIT]]
+    return value
+
+def summarize_analysis(filename: str, analysis: dict) -> dict:
+    """
+    Compact, size-bounded per-document summary used in the case digest, so
+    the strategy prompt doesn't grow with each document's full analysis.
+    """
+    summary = {"document": filename}
+    for key in ("agreement_type", "parties", "risk_rating", "key_risks",
+                "termination_clause", "payment_terms", "liability_indemnity"):
+        if analysis.get(key):
+            summary[key] = _clip(analysis[key])
+    return summary
+
+def refresh_case_digest(db, case_id: str):
+    """
+    Rebuilds the case digest from the stored per-document summaries. Only
+    called when a document is added or removed; reads just the summary column.
+    """
+    rows = db.query(Document.id, Document.summary_json)\
+        .filter(Document.case_id == case_id, Document.summary_json.isnot(None))\
+        .order_by(Document.created_at)\
+        .all()
+    case = db.query(Case).filter(Case.id == case_id).first()
+    if case is None:
+        return
+    case.digest_json = [summary for _, summary in rows]
+    db.commit()
+
+def case_summary_text(case: Case) -> str:
+    return f"Title: {case.title}. Category: {case.category}. Status: {case.status}"
+
+def strategy_inputs_hash(case_summary: str, digest: list) -> str:
+    payload = json.dumps({"case": case_summary, "digest": digest}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def is_strategy_current(case: Case) -> bool:
+    return bool(case.strategy) and case.strategy_inputs_hash == strategy_inputs_hash(
+        case_summary_text(case), case.digest_json or []
+    )
+
+def _save_strategy(case: Case, case_summary: str, digest: list, strategy: str):
+    case.strategy = strategy
+    case.strategy_inputs_hash = strategy_inputs_hash(case_summary, digest)
+    case.strategy_updated_at = datetime.utcnow()
+
+async def build_strategy(case: Case, refresh: bool = False) -> str:
+    """
+    Generates a strategy from the case digest and stores it on the case with
+    the hash of its inputs. `refresh` bypasses the LLM response cache. The
+    caller commits.
+    """
+    case_summary = case_summary_text(case)
+    digest = case.digest_json or []
+    strategy = await generate_case_strategy(case_summary, digest, case_id=case.id, refresh=refresh)
+    _save_strategy(case, case_summary, digest, strategy)
+    return strategy
+
+def build_strategy_sync(case: Case, refresh: bool = False) -> str:
+    """
+    build_strategy for job workers (no event loop).
+    """
+    case_summary = case_summary_text(case)
+    digest = case.digest_json or []
+    strategy = generate_case_strategy_sync(case_summary, digest, case_id=case.id, refresh=refresh)
+    _save_strategy(case, case_summary, digest, strategy)
+    return strategy
+
+@job_handler("regenerate_strategy")
+def regenerate_strategy_job(ctx: JobContext):
+    case_id = ctx.payload["case_id"]
+    db = SessionLocal()
+    try:
+        case = db.query(Case).filter(Case.id == case_id).first()
+        if case is None:
+            raise RuntimeError(f"Case {case_id} not found")
+        ctx.stage("generate", 90, build_strategy_sync, case, True)
+        ctx.stage("save", 100, db.commit)
+        return {"case_id": case_id}
+    finally:
+        db.close()
\ No newline at end of file
@@ -0,0 +1,327 @@
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+VECTOR_INDEX_DIR = "./vector_index"
+# "exact" scans the case's vectors; "hnsw" queries an hnswlib graph that is
+# built and saved at ingestion time (falls back to exact without hnswlib)
+VECTOR_SEARCH = os.getenv("VECTOR_SEARCH", "exact")
+VECTOR_CACHE_SIZE = int(os.getenv("VECTOR_CACHE_SIZE", "32"))
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+# Exact search over a few thousand rows is already fast; below this no graph is built
+HNSW_MIN_ROWS = int(os.getenv("HNSW_MIN_ROWS", "5000"))
+HNSW_FILE = "hnsw.bin"
+
+if VECTOR_SEARCH == "hnsw" and hnswlib is None:
+    print("⚠️ VECTOR_SEARCH=hnsw needs the hnswlib package; using exact search.")
+
+def _hnsw_enabled() -> bool:
+    return VECTOR_SEARCH == "hnsw" and hnswlib is not None
+
+def _update_hnsw(directory: str, total_rows: int, dim: int):
+    """
+    Adds the rows appended since the case's saved graph was written (or
+    builds it once the case reaches HNSW_MIN_ROWS) and saves it next to the
+    vectors. Runs in the writer, so queries only ever load a finished graph.
+    """
+    if not _hnsw_enabled() or total_rows < HNSW_MIN_ROWS:
+        return
+    path = os.path.join(directory, HNSW_FILE)
+    index, count = None, 0
+    if os.path.exists(path):
+        try:
+            index = hnswlib.Index(space="ip", dim=dim)
+            index.load_index(path)
+            count = index.get_current_count()
+        except Exception as e:
+            print(f"⚠️ Rebuilding unreadable HNSW graph in {directory}: {e}")
+            index = None
+        if index is not None and count > total_rows:
+            # Left over from an earlier case with the same id
+            index = None
+    if index is None:
+        index = hnswlib.Index(space="ip", dim=dim)
+        index.init_index(max_elements=total_rows, ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+        count = 0
+    if count == total_rows:
+        return
+    if index.get_max_elements() < total_rows:
+        index.resize_index(total_rows)
+
+    vectors = np.memmap(
+        os.path.join(directory, "vectors.f32"), dtype=np.float32, mode="r", shape=(total_rows, dim)
+    )
+    index.add_items(np.asarray(vectors[count:]), np.arange(count, total_rows))
+    tmp_path = path + ".tmp"
+    index.save_index(tmp_path)
+    os.replace(tmp_path, path)
+
+def _load_hnsw(directory: str, dim: int, rows: int):
+    """
+    The case's saved graph and the number of rows it covers, or (None, 0).
+    """
+    path = os.path.join(directory, HNSW_FILE)
+    if not _hnsw_enabled() or not os.path.exists(path):
+        return None, 0
+    try:
+        index = hnswlib.Index(space="ip", dim=dim)
+        index.load_index(path)
+    except Exception as e:
+        print(f"⚠️ Could not load HNSW graph in {directory}: {e}")
+        return None, 0
+    count = index.get_current_count()
+    if count > rows:
+        # Saved for rows this reader doesn't see yet; the next refresh picks it up
+        return None, 0
+    return index, count
+
+class CaseVectors:
+    """
+    One case's index as loaded for search: the float32 vectors memory-mapped
+    from disk, the row texts/metadata, and its saved HNSW graph if any.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.rows = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.hnsw = None
+        self.hnsw_rows = 0
+        self.lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        rows_path = os.path.join(self.directory, "rows.jsonl")
+        meta_path = os.path.join(self.directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, encoding="utf-8") as f:
+            dim = json.load(f)["dim"]
+        self.rows = _read_rows(rows_path)
+        if self.rows:
+            self.vectors = np.memmap(
+                os.path.join(self.directory, "vectors.f32"),
+                dtype=np.float32, mode="r", shape=(len(self.rows), dim)
+            )
+        self.hnsw, self.hnsw_rows = _load_hnsw(self.directory, dim, len(self.rows))
+
+    def _exact(self, query, k: int, start: int = 0):
+        sims = np.asarray(self.vectors[start:] @ query)
+        k = min(k, len(sims))
+        if k == 0:
+            return []
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(start + int(i), float(sims[i])) for i in top]
+
+    def search(self, query, k: int):
+        with self.lock:
+            if not self.rows:
+                return []
+            if self.hnsw is None:
+                hits = self._exact(query, k)
+            else:
+                self.hnsw.set_ef(max(HNSW_EF_SEARCH, k))
+                labels, distances = self.hnsw.knn_query(query, k=min(k, self.hnsw_rows))
+                # Inner-product distance is 1 - cosine for unit vectors
+                hits = [(int(row), 1.0 - float(d)) for row, d in zip(labels[0], distances[0])]
+                # Rows appended after the graph was saved are scanned exactly
+                hits += self._exact(query, k, start=self.hnsw_rows)
+                hits = sorted(hits, key=lambda hit: hit[1], reverse=True)[:k]
+            return [(self.rows[row], score) for row, score in hits]
+
+def _read_rows(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    # The last element is "" or a line still being written
+    return [json.loads(line) for line in lines[:-1] if line]
+
+def _signature(directory: str):
+    try:
+        return os.stat(os.path.join(directory, "rows.jsonl")).st_size
+    except FileNotFoundError:
+        return None
+
+def _cache_signature(directory: str):
+    # Rows, and the graph that the writer saves right after them
+    size = _signature(directory)
+    if size is None:
+        return None
+    try:
+        return size, os.stat(os.path.join(directory, HNSW_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        return size, None
+
+def _unit(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class MmapVectorStore(VectorStore):
+    """
+    Vector store with one small index per case under VECTOR_INDEX_DIR/<case_id>:
+
+    - vectors.f32: unit-length float32 rows, appended, read via np.memmap
+    - rows.jsonl: id, text and metadata per row, in the same order
+    - meta.json: the vector dimension
+    - hnsw.bin: hnswlib graph over the rows (VECTOR_SEARCH=hnsw, large cases)
+
+    Queries filtered on case_id only touch that case's files, and deleting a
+    case removes its directory. Writers are serialized by the caller
+    (rag_service's write lock).
+    """
+
+    def __init__(self, embedding_function, directory: str = VECTOR_INDEX_DIR):
+        self.embedding_function = embedding_function
+        self.directory = directory
+        self._cache = OrderedDict()  # case_id -> (signature, CaseVectors)
+        self._cache_lock = threading.Lock()
+        self._ids = {}  # case_id -> (rows.jsonl size, ids written), for writers
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    def _case_dir(self, case_id: str) -> str:
+        return os.path.join(self.directory, str(case_id))
+
+    def _append(self, case_id: str, ids: list, texts: list, metadatas: list, vectors):
+        directory = self._case_dir(case_id)
+        os.makedirs(directory, exist_ok=True)
+        rows_path = os.path.join(directory, "rows.jsonl")
+        vectors_path = os.path.join(directory, "vectors.f32")
+        meta_path = os.path.join(directory, "meta.json")
+
+        size = _signature(directory)
+        if size is None:
+            existing = set()
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": int(vectors.shape[1])}, f)
+        else:
+            known = self._ids.get(case_id)
+            existing = known[1] if known and known[0] == size else {
+                row["id"] for row in _read_rows(rows_path)
+            }
+
+        # Chunk ids are stable, so a retried batch is skipped rather than duplicated
+        keep = [i for i, row_id in enumerate(ids) if row_id not in existing]
+        if not keep:
+            return
+        row_bytes = vectors.shape[1] * 4
+        with open(vectors_path, "ab") as f:
+            # Drops vectors left over from a write that died before its rows
+            f.truncate(len(existing) * row_bytes)
+            f.write(vectors[keep].tobytes())
+        with open(rows_path, "a", encoding="utf-8") as f:
+            for i in keep:
+                f.write(json.dumps({"id": ids[i], "text": texts[i], "metadata": metadatas[i]}) + "\n")
+        existing.update(ids[i] for i in keep)
+        self._ids[case_id] = (_signature(directory), existing)
+        _update_hnsw(directory, len(existing), int(vectors.shape[1]))
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [os.urandom(16).hex() for _ in texts]
+        vectors = _unit(self.embedding_function.embed_documents(texts))
+
+        by_case = {}
+        for i, metadata in enumerate(metadatas):
+            by_case.setdefault(metadata.get("case_id", "unknown"), []).append(i)
+        for case_id, rows in by_case.items():
+            self._append(
+                case_id,
+                [ids[i] for i in rows],
+                [texts[i] for i in rows],
+                [metadatas[i] for i in rows],
+                vectors[rows]
+            )
+            self._refresh(case_id)
+        return ids
+
+    def _refresh(self, case_id: str) -> CaseVectors:
+        directory = self._case_dir(case_id)
+        signature = _cache_signature(directory)
+        with self._cache_lock:
+            cached = self._cache.get(case_id)
+            if cached is not None:
+                self._cache.move_to_end(case_id)
+                if cached[0] == signature:
+                    return cached[1]
+        if cached is not None and signature is not None:
+            index = cached[1]
+            with index.lock:
+                index.reload()
+        else:
+            index = CaseVectors(directory)
+        with self._cache_lock:
+            self._cache[case_id] = (signature, index)
+            while len(self._cache) > VECTOR_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return index
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, filter: dict = None, **kwargs):
+        query = _unit(embedding)
+        if filter and "case_id" in filter:
+            case_ids = [filter["case_id"]]
+        elif os.path.isdir(self.directory):
+            case_ids = os.listdir(self.directory)
+        else:
+            case_ids = []
+
+        hits = []
+        for case_id in case_ids:
+            hits.extend(self._refresh(case_id).search(query, k))
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return [
+            (Document(page_content=row["text"], metadata=row["metadata"]), score)
+            for row, score in hits[:k]
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k, filter)
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter: dict = None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    def delete(self, ids=None, where: dict = None, **kwargs):
+        """
+        Only whole-case deletes are supported: `where={"case_id": ...}`.
+        Returns the number of rows removed.
+        """
+        if not where or "case_id" not in where:
+            raise ValueError("MmapVectorStore only deletes by case_id")
+        case_id = where["case_id"]
+        directory = self._case_dir(case_id)
+        rows_path = os.path.join(directory, "rows.jsonl")
+        removed = len(_read_rows(rows_path)) if os.path.exists(rows_path) else 0
+        with self._cache_lock:
+            self._cache.pop(case_id, None)
+        self._ids.pop(case_id, None)
+        shutil.rmtree(directory, ignore_errors=True)
+        return removed
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, **kwargs):
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
\ No newline at end of file
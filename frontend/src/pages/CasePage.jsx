@@ -11,11 +11,14 @@ export default function CasePage() {
 
   // Chat State
   const [messages, setMessages] = useState([]);
+  const [olderMessagesCursor, setOlderMessagesCursor] = useState(null);
   const [input, setInput] = useState('');
   const [sending, setSending] = useState(false);
   const messagesEndRef = useRef(null);
 
   // Docs State
+  const [documents, setDocuments] = useState([]);
+  const [documentsCursor, setDocumentsCursor] = useState(null);
   const [uploading, setUploading] = useState(false);
 
   // Strategy State
@@ -34,10 +37,7 @@ export default function CasePage() {
     try {
       const res = await api.get(`/cases/${id}`);
       setCaseData(res.data);
-      const sortedMsgs = (res.data.messages || []).sort((a,b) => 
-        new Date(a.created_at) - new Date(b.created_at)
-      );
-      setMessages(sortedMsgs);
+      await Promise.all([fetchMessages(), fetchDocuments()]);
     } catch (err) {
       alert("Error loading case");
     } finally {
@@ -45,6 +45,20 @@ export default function CasePage() {
     }
   };
 
+  // Pages come newest first; older messages are prepended
+  const fetchMessages = async (cursor = null) => {
+    const res = await api.get(`/cases/${id}/messages`, { params: cursor ? { cursor } : {} });
+    const page = [...res.data.items].reverse();
+    setMessages(prev => cursor ? [...page, ...prev] : page);
+    setOlderMessagesCursor(res.data.next_cursor);
+  };
+
+  const fetchDocuments = async (cursor = null) => {
+    const res = await api.get(`/cases/${id}/documents`, { params: cursor ? { cursor } : {} });
+    setDocuments(prev => cursor ? [...prev, ...res.data.items] : res.data.items);
+    setDocumentsCursor(res.data.next_cursor);
+  };
+
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   };
@@ -92,7 +106,7 @@ export default function CasePage() {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
       alert("File uploaded! Processing started.");
-      fetchCaseDetails(); 
+      fetchDocuments(); 
     } catch (err) {
       alert("Upload failed");
     } finally {
@@ -155,6 +169,14 @@ export default function CasePage() {
         {activeTab === 'chat' && (
           <div className="h-full flex flex-col max-w-4xl mx-auto bg-white shadow-xl border-x">
             <div className="flex-1 overflow-y-auto p-6 space-y-6">
+              {olderMessagesCursor && (
+                <button
+                  onClick={() => fetchMessages(olderMessagesCursor)}
+                  className="block mx-auto text-sm text-lex-600 hover:text-lex-700"
+                >
+                  Load earlier messages
+                </button>
+              )}
               {messages.length === 0 && (
                 <div className="text-center text-gray-400 mt-10">
                   <p>No messages yet. Ask LexGuard anything about this case.</p>
@@ -215,9 +237,9 @@ export default function CasePage() {
             </div>
 
             <div className="grid gap-4">
-              {caseData?.documents?.length === 0 && <p className="text-gray-500">No documents uploaded yet.</p>}
+              {documents.length === 0 && <p className="text-gray-500">No documents uploaded yet.</p>}
               
-              {caseData?.documents?.map(doc => (
+              {documents.map(doc => (
                 <div key={doc.id} className="bg-white p-4 rounded-lg border flex justify-between items-center shadow-sm">
                   <div className="flex items-center gap-3">
                     <div className="bg-red-100 text-red-600 p-2 rounded">PDF</div>
@@ -227,10 +249,19 @@ export default function CasePage() {
                     </div>
                   </div>
                   <div className="text-xs bg-green-100 text-green-700 px-2 py-1 rounded">
-                    {doc.analysis_json ? "Analyzed" : "Processing"}
+                    {doc.status === 'processed' ? "Analyzed" : doc.status === 'partial' ? "Not analyzed" : doc.status === 'failed' ? "Failed" : "Processing"}
                   </div>
                 </div>
               ))}
+
+              {documentsCursor && (
+                <button
+                  onClick={() => fetchDocuments(documentsCursor)}
+                  className="text-lex-600 hover:text-lex-700 font-medium py-2"
+                >
+                  Load more documents
+                </button>
+              )}
             </div>
           </div>
         )}
@@ -8,6 +8,7 @@ export default function Dashboard() {
   const navigate = useNavigate();
   
   const [cases, setCases] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   
   // New Case Form State
@@ -20,10 +21,12 @@ export default function Dashboard() {
     fetchCases();
   }, []);
 
-  const fetchCases = async () => {
+  // Cases come in pages; pass a cursor to append the next page
+  const fetchCases = async (cursor = null) => {
     try {
-      const res = await api.get('/cases/'); // Trailing slash might matter depending on router
-      setCases(res.data);
+      const res = await api.get('/cases/', { params: cursor ? { cursor } : {} }); // Trailing slash might matter depending on router
+      setCases(prev => cursor ? [...prev, ...res.data.items] : res.data.items);
+      setNextCursor(res.data.next_cursor);
     } catch (err) {
       console.error("Failed to fetch cases", err);
     } finally {
@@ -127,6 +130,15 @@ export default function Dashboard() {
                 <p className="text-sm text-gray-500">Category: {c.category}</p>
               </div>
             ))}
+
+            {nextCursor && (
+              <button
+                onClick={() => fetchCases(nextCursor)}
+                className="col-span-full text-lex-600 hover:text-lex-700 font-medium py-2"
+              >
+                Load more cases
+              </button>
+            )}
           </div>
         )}
       </main>